@@ -4,6 +4,7 @@ Smart Photo System Main Entry Point
 """
 
 import os
+import json
 import uvicorn
 from dotenv import load_dotenv
 from smart_photo_system import create_app
@@ -15,8 +16,42 @@ load_dotenv()
 config = {
     "upload_dir": os.getenv("UPLOAD_DIR", "/tmp/smart_photo_uploads"),
     "output_dir": os.getenv("OUTPUT_DIR", "/tmp/smart_photo_output"),
+    "max_upload_bytes": int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024)),
+    "session_backend": os.getenv("SESSION_BACKEND", "memory"),
+    "redis_url": os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+    "session_idle_ttl": float(os.getenv("SESSION_IDLE_TTL", 3600)),
+    "session_max_age": float(os.getenv("SESSION_MAX_AGE", 86400)),
+    "capture_workers_per_device": int(os.getenv("CAPTURE_WORKERS_PER_DEVICE", 1)),
+    "capture_max_queue": int(os.getenv("CAPTURE_MAX_QUEUE", 16)),
+    "photo_cache_dir": os.getenv("PHOTO_CACHE_DIR") or None,
+    "photo_cache_max_bytes": int(os.getenv("PHOTO_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
     "iphone_api_endpoint": os.getenv("IPHONE_API_ENDPOINT", "http://localhost:8080/iphone-control"),
-    "capture_api_endpoint": os.getenv("CAPTURE_API_ENDPOINT", "http://localhost:8080/iphone-capture")
+    "capture_api_endpoint": os.getenv("CAPTURE_API_ENDPOINT", "http://localhost:8080/iphone-capture"),
+    "device_connect_timeout": float(os.getenv("DEVICE_CONNECT_TIMEOUT", 3)),
+    "device_control_timeout": float(os.getenv("DEVICE_CONTROL_TIMEOUT", 10)),
+    "device_capture_timeout": float(os.getenv("DEVICE_CAPTURE_TIMEOUT", 30)),
+    "device_download_timeout": float(os.getenv("DEVICE_DOWNLOAD_TIMEOUT", 30)),
+    "device_download_retries": int(os.getenv("DEVICE_DOWNLOAD_RETRIES", 2)),
+    "device_max_connections": int(os.getenv("DEVICE_MAX_CONNECTIONS", 32)),
+    "device_max_per_host": int(os.getenv("DEVICE_MAX_PER_HOST", 4)),
+    "device_breaker_threshold": int(os.getenv("DEVICE_BREAKER_THRESHOLD", 3)),
+    "device_breaker_base_delay": float(os.getenv("DEVICE_BREAKER_BASE_DELAY", 1)),
+    "device_breaker_max_delay": float(os.getenv("DEVICE_BREAKER_MAX_DELAY", 60)),
+    "device_combined_capture": os.getenv("DEVICE_COMBINED_CAPTURE", "false").lower() == "true",
+    "camera_devices": json.loads(os.getenv("CAMERA_DEVICES", "[]")),
+    "device_max_failures": int(os.getenv("DEVICE_MAX_FAILURES", 3)),
+    "device_retry_after": float(os.getenv("DEVICE_RETRY_AFTER", 30)),
+    "analysis_max_workers": int(os.getenv("ANALYSIS_MAX_WORKERS")) if os.getenv("ANALYSIS_MAX_WORKERS") else None,
+    "analysis_max_queue": int(os.getenv("ANALYSIS_MAX_QUEUE", 32)),
+    "analysis_max_edge": int(os.getenv("ANALYSIS_MAX_EDGE", 0)) or None,
+    "composition_grids": [spec for spec in os.getenv("COMPOSITION_GRIDS", "4x4,golden_ratio").split(",") if spec],
+    "saliency_cells": int(os.getenv("SALIENCY_CELLS", 16)),
+    "analysis_fields": [name for name in os.getenv("ANALYSIS_FIELDS", "").split(",") if name] or None,
+    "analysis_profiles": json.loads(os.getenv("ANALYSIS_PROFILES", "{}")),
+    "analysis_cache_max_bytes": int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    "analysis_cache_dir": os.getenv("ANALYSIS_CACHE_DIR") or None,
+    "batch_root": os.getenv("BATCH_ROOT") or None,
+    "batch_max_files": int(os.getenv("BATCH_MAX_FILES", 500))
 }
 
 # Create FastAPI application
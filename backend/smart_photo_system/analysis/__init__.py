@@ -0,0 +1,9 @@
+from .cache import AnalysisCache
+from .composition import CompositionEngine
+from .context import ImageContext
+from .executor import AnalysisExecutor, AnalysisQueueFullError
+from .metrics import METRICS, MetricSpec, resolve_metrics
+from .stats import ImageStats
+
+__all__ = ['AnalysisCache', 'CompositionEngine', 'ImageContext', 'AnalysisExecutor', 'AnalysisQueueFullError',
+           'ImageStats', 'METRICS', 'MetricSpec', 'resolve_metrics']
@@ -0,0 +1,239 @@
+"""
+Analyzer micro-benchmark suite.
+
+Synthesizes images at standard phone resolutions with several colour/edge
+profiles, runs the full analysis and each analyzer sub-method, and reports
+wall time, peak RSS and traced allocations per stage as JSON.
+
+Usage:
+    python -m smart_photo_system.analysis.benchmark --resolutions 1MP,12MP --repeat 3 -o bench.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .context import ImageContext
+
+# Common phone sensor outputs as (width, height)
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    "1MP": (1152, 864),
+    "12MP": (4032, 3024),
+    "24MP": (5712, 4284),
+    "48MP": (8064, 6048)
+}
+
+PROFILES = ("flat", "gradient", "noise", "edges")
+
+# Analyzer sub-methods taking an ImageContext
+SUB_STAGES = ("_analyze_composition", "_analyze_colors", "_detect_scene_type", "_estimate_exposure")
+
+
+def synthesize_image(profile: str, size: Tuple[int, int], seed: int = 0) -> np.ndarray:
+    """Build a deterministic BGR test image"""
+    width, height = size
+    rng = np.random.default_rng(seed)
+
+    if profile == "flat":
+        # Nearly uniform, low-edge scene (portrait-like backdrop)
+        img = np.full((height, width, 3), (120, 130, 140), dtype=np.uint8)
+        noise = rng.integers(-4, 5, size=(height, width, 1), dtype=np.int16)
+        return np.clip(img + noise, 0, 255).astype(np.uint8)
+    if profile == "gradient":
+        # Smooth colour ramps (sky/landscape-like)
+        x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        img = np.empty((height, width, 3), dtype=np.uint8)
+        img[..., 0] = (x + 0 * y).astype(np.uint8)
+        img[..., 1] = (y + 0 * x).astype(np.uint8)
+        img[..., 2] = ((x + y) / 2).astype(np.uint8)
+        return img
+    if profile == "noise":
+        # Worst case for histograms and edges
+        return rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    if profile == "edges":
+        # High edge density (architecture-like): checkerboard plus rectangles
+        cell = max(8, min(width, height) // 64)
+        yy, xx = np.indices((height, width))
+        board = (((yy // cell) + (xx // cell)) % 2 * 200 + 30).astype(np.uint8)
+        img = cv2.cvtColor(board, cv2.COLOR_GRAY2BGR)
+        for _ in range(32):
+            x0, y0 = int(rng.integers(0, width)), int(rng.integers(0, height))
+            color = tuple(int(c) for c in rng.integers(0, 256, size=3))
+            cv2.rectangle(img, (x0, y0), (x0 + width // 10, y0 + height // 10), color, thickness=-1)
+        return img
+    raise ValueError(f"Unknown image profile: {profile}")
+
+
+def _current_rss() -> int:
+    """Resident set size in bytes (Linux /proc, falling back to peak RSS)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class _RssSampler:
+    """Samples RSS in a background thread to find the peak during a stage"""
+
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.baseline = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _current_rss())
+            time.sleep(self.interval)
+
+    def __enter__(self) -> "_RssSampler":
+        self.baseline = self.peak = _current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+def measure_stage(run: Callable[[Any], Any], setup: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Time a stage and measure its memory; ``setup`` output is passed to ``run``"""
+    timings = []
+    for _ in range(repeat):
+        prepared = setup()
+        started = time.perf_counter()
+        run(prepared)
+        timings.append(time.perf_counter() - started)
+        del prepared
+
+    # Memory pass is separate so tracing overhead does not skew timings
+    prepared = setup()
+    tracemalloc.start()
+    try:
+        with _RssSampler() as rss:
+            run(prepared)
+        _, alloc_peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del prepared
+
+    stats = snapshot.statistics("filename")
+    return {
+        "wall_seconds": {
+            "min": round(min(timings), 6),
+            "median": round(statistics.median(timings), 6),
+            "max": round(max(timings), 6)
+        },
+        "peak_rss_bytes": rss.peak,
+        "rss_growth_bytes": rss.peak - rss.baseline,
+        "alloc_peak_bytes": alloc_peak,
+        "alloc_retained_bytes": sum(stat.size for stat in stats),
+        "alloc_retained_blocks": sum(stat.count for stat in stats)
+    }
+
+
+def run_benchmarks(resolutions: List[str], profiles: List[str], repeat: int = 3,
+                   max_edge: Optional[int] = None, work_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Benchmark every resolution/profile combination"""
+    from ..nodes.image_analyzer_node import ImageAnalyzerNode
+
+    analyzer = ImageAnalyzerNode(max_edge=max_edge)
+    results = []
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as temp_dir:
+        for resolution in resolutions:
+            size = RESOLUTIONS[resolution]
+            for profile in profiles:
+                image_path = os.path.join(temp_dir, f"{resolution}_{profile}.jpg")
+                cv2.imwrite(image_path, synthesize_image(profile, size), [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+                def load_context() -> ImageContext:
+                    return ImageContext.from_file(image_path, max_edge=max_edge)
+
+                stages: Dict[str, Tuple[Callable[[], Any], Callable[[Any], Any]]] = {
+                    "decode": (lambda: None, lambda _: load_context()),
+                    "_analyze_image": (lambda: None, lambda _: analyzer._compute_analysis(image_path))
+                }
+                for method_name in SUB_STAGES:
+                    # Sub-methods get a freshly decoded context so each pays for its own intermediates
+                    stages[method_name] = (load_context, getattr(analyzer, method_name))
+
+                for stage, (setup, run) in stages.items():
+                    measurement = measure_stage(run, setup, repeat)
+                    results.append({
+                        "resolution": resolution,
+                        "width": size[0],
+                        "height": size[1],
+                        "profile": profile,
+                        "stage": stage,
+                        **measurement
+                    })
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "cpu_count": os.cpu_count(),
+            "platform": platform.platform()
+        },
+        "repeat": repeat,
+        "max_edge": max_edge,
+        "results": results
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ImageAnalyzerNode stages")
+    parser.add_argument("--resolutions", default=",".join(RESOLUTIONS),
+                        help=f"Comma separated subset of {', '.join(RESOLUTIONS)}")
+    parser.add_argument("--profiles", default=",".join(PROFILES),
+                        help=f"Comma separated subset of {', '.join(PROFILES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage")
+    parser.add_argument("--max-edge", type=int, default=None, help="Benchmark proxy analysis at this longest edge")
+    parser.add_argument("-o", "--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    resolutions = [name for name in args.resolutions.split(",") if name]
+    profiles = [name for name in args.profiles.split(",") if name]
+    unknown = [name for name in resolutions if name not in RESOLUTIONS] + \
+              [name for name in profiles if name not in PROFILES]
+    if unknown:
+        parser.error(f"Unknown resolution/profile: {', '.join(unknown)}")
+
+    # Node logging goes to stdout; keep it out of the JSON report
+    output = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmarks(resolutions, profiles, repeat=max(args.repeat, 1), max_edge=args.max_edge)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, output, indent=2)
+        output.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
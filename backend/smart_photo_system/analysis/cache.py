@@ -0,0 +1,130 @@
+import asyncio
+import json
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiofiles
+
+
+class AnalysisCache:
+    """Content-addressed cache of analysis results.
+
+    Entries are JSON documents keyed by upload hash (plus analyzer options).
+    The in-memory tier is an LRU bounded by the total size of the serialized
+    entries; the optional on-disk tier survives restarts. Concurrent requests
+    for a key that is being computed wait for the same computation.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, cache_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        safe_key = key.replace(os.sep, "_").replace(":", "_")
+        return os.path.join(self.cache_dir, safe_key[:2], f"{safe_key}.json")
+
+    def _remember(self, key: str, data: bytes):
+        """Insert into the memory tier and evict least recently used entries"""
+        if len(data) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    async def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        try:
+            async with aiofiles.open(self._disk_path(key), "rb") as f:
+                return await f.read()
+        except FileNotFoundError:
+            return None
+
+    async def _write_disk(self, key: str, data: bytes):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial entry
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        async with aiofiles.open(temp_path, "wb") as f:
+            await f.write(data)
+        os.replace(temp_path, path)
+
+    async def _lookup(self, key: str) -> Optional[bytes]:
+        """Serialized entry from memory, falling back to disk"""
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            return data
+
+        data = await self._read_disk(key)
+        if data is not None:
+            self._remember(key, data)
+        return data
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of a cached entry, or None"""
+        data = await self._lookup(key)
+        return json.loads(data) if data is not None else None
+
+    async def put(self, key: str, value: Dict[str, Any]) -> bytes:
+        """Store an entry in both tiers and return its serialized form"""
+        data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        self._remember(key, data)
+        await self._write_disk(key, data)
+        return data
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Return the cached value for key, computing it at most once concurrently"""
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return json.loads(await asyncio.shield(inflight))
+
+        # Register before any await so concurrent callers join this lookup
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await self._lookup(key)
+            if data is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                data = await self.put(key, await compute())
+            future.set_result(data)
+            return json.loads(data)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Avoid "exception was never retrieved" when nobody else waited
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "inflight": len(self._inflight),
+            "disk": bool(self.cache_dir)
+        }
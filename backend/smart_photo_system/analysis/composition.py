@@ -0,0 +1,119 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# Golden ratio section lines as fractions of width/height
+GOLDEN_LINES = (0.0, 1 - 0.6180339887, 0.6180339887, 1.0)
+
+THIRDS_REGION_NAMES = (
+    ("top_left", "top_center", "top_right"),
+    ("center_left", "center", "center_right"),
+    ("bottom_left", "bottom_center", "bottom_right")
+)
+
+
+def parse_grid_spec(spec: str) -> Tuple[Sequence[float], Sequence[float]]:
+    """Turn "golden_ratio" or "<rows>x<cols>" into (row lines, column lines)"""
+    if spec == "golden_ratio":
+        return GOLDEN_LINES, GOLDEN_LINES
+    try:
+        rows, cols = (int(part) for part in spec.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Invalid composition grid: {spec}")
+    if rows < 1 or cols < 1:
+        raise ValueError(f"Invalid composition grid: {spec}")
+    return np.linspace(0.0, 1.0, rows + 1), np.linspace(0.0, 1.0, cols + 1)
+
+
+class CompositionEngine:
+    """Edge-density queries over a summed-area table.
+
+    The integral image of the binary edge map is built once; the edge count
+    of any axis-aligned rectangle is then four lookups, so grids of any size
+    and arbitrary regions cost O(1) per cell instead of a pass over pixels.
+    """
+
+    def __init__(self, edges: np.ndarray):
+        self.height, self.width = edges.shape[:2]
+        _, mask = cv2.threshold(edges, 0, 1, cv2.THRESH_BINARY)
+        self.integral = cv2.integral(mask, sdepth=cv2.CV_32S)
+
+    @property
+    def edge_count(self) -> int:
+        return int(self.integral[-1, -1])
+
+    @property
+    def edge_density(self) -> float:
+        """Fraction of edge pixels in the whole image"""
+        return self.edge_count / max(self.height * self.width, 1)
+
+    def _counts(self, ys: np.ndarray, xs: np.ndarray) -> np.ndarray:
+        """Edge counts for every cell between consecutive pixel lines"""
+        table = self.integral[np.ix_(ys, xs)].astype(np.int64)
+        return table[1:, 1:] - table[:-1, 1:] - table[1:, :-1] + table[:-1, :-1]
+
+    def _pixel_lines(self, fractions: Sequence[float], size: int) -> np.ndarray:
+        return np.clip(np.round(np.asarray(fractions, dtype=np.float64) * size), 0, size).astype(np.int64)
+
+    def grid_density(self, row_lines: Sequence[float], col_lines: Sequence[float]) -> np.ndarray:
+        """Edge density of each cell of a grid given by fractional lines"""
+        ys = self._pixel_lines(row_lines, self.height)
+        xs = self._pixel_lines(col_lines, self.width)
+        areas = np.outer(np.diff(ys), np.diff(xs))
+        return self._counts(ys, xs) / np.maximum(areas, 1)
+
+    def region_density(self, x0: float, y0: float, x1: float, y1: float) -> float:
+        """Edge density of a rectangle given as fractions of width/height"""
+        return float(self.grid_density((y0, y1), (x0, x1))[0, 0])
+
+    def saliency_map(self, long_edge_cells: int = 16) -> Dict[str, Any]:
+        """Downsampled edge-density heatmap normalized to 0-1"""
+        if self.width >= self.height:
+            cols = long_edge_cells
+            rows = max(1, round(long_edge_cells * self.height / max(self.width, 1)))
+        else:
+            rows = long_edge_cells
+            cols = max(1, round(long_edge_cells * self.width / max(self.height, 1)))
+
+        density = self.grid_density(np.linspace(0.0, 1.0, rows + 1), np.linspace(0.0, 1.0, cols + 1))
+        peak = density.max()
+        if peak > 0:
+            density = density / peak
+
+        return {
+            "rows": rows,
+            "cols": cols,
+            "values": np.round(density, 3).tolist()
+        }
+
+    def analyze(self, grids: List[str], regions: Dict[str, Sequence[float]],
+                saliency_cells: int) -> Dict[str, Any]:
+        """Rule-of-thirds summary plus any configured grids, regions and saliency map"""
+        thirds = self.grid_density(*parse_grid_spec("3x3"))
+        edge_density = {
+            THIRDS_REGION_NAMES[row][col]: float(thirds[row, col])
+            for row in range(3)
+            for col in range(3)
+        }
+        main_region = max(edge_density.keys(), key=lambda k: edge_density[k])
+
+        result = {
+            "main_subject_region": main_region,
+            "edge_density": edge_density,
+            "rule_of_thirds_compliance": main_region in ["top_left", "top_right", "bottom_left", "bottom_right"]
+        }
+
+        if grids:
+            result["grids"] = {
+                spec: np.round(self.grid_density(*parse_grid_spec(spec)), 4).tolist()
+                for spec in grids
+            }
+        if regions:
+            result["regions"] = {
+                name: self.region_density(*bounds) for name, bounds in regions.items()
+            }
+        if saliency_cells:
+            result["saliency"] = self.saliency_map(saliency_cells)
+
+        return result
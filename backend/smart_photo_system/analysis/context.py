@@ -0,0 +1,116 @@
+from functools import cached_property
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .composition import CompositionEngine
+from .stats import ImageStats
+
+
+class ImageContext:
+    """Decoded image plus lazily computed shared intermediates.
+
+    The image is decoded once; grayscale, HSV and the edge map are each
+    computed at most once and shared by every metric that needs them.
+    """
+
+    # Canny thresholds shared by composition and scene detection
+    CANNY_LOW = 50
+    CANNY_HIGH = 150
+
+    # OpenCV reduced-read flags (DCT-domain scaling for JPEG)
+    REDUCED_READ_FLAGS = (
+        (8, cv2.IMREAD_REDUCED_COLOR_8),
+        (4, cv2.IMREAD_REDUCED_COLOR_4),
+        (2, cv2.IMREAD_REDUCED_COLOR_2)
+    )
+
+    def __init__(self, bgr: np.ndarray, source: str = None, original_size: Tuple[int, int] = None):
+        if bgr is None or bgr.ndim != 3 or bgr.shape[2] != 3:
+            raise ValueError("ImageContext expects a 3-channel BGR image")
+        self.bgr = bgr
+        self.source = source
+        # (width, height) of the file before any proxy reduction
+        self.original_size = original_size or (bgr.shape[1], bgr.shape[0])
+
+    @classmethod
+    def from_file(cls, image_path: str, max_edge: Optional[int] = None) -> "ImageContext":
+        """Decode image file once into BGR.
+
+        With ``max_edge`` set, the image is decoded as a proxy whose longest
+        edge is at most ``max_edge`` pixels: JPEGs are scaled by 1/2, 1/4 or
+        1/8 during decoding and the remainder is resized with area averaging.
+        """
+        if not max_edge:
+            bgr = cv2.imread(image_path, cv2.IMREAD_COLOR)
+            if bgr is None:
+                raise ValueError("Cannot read image with OpenCV")
+            return cls(bgr, source=image_path)
+
+        # Header-only probe for the full-resolution size
+        with Image.open(image_path) as img:
+            original_size = img.size
+
+        read_flag = cv2.IMREAD_COLOR
+        longest = max(original_size)
+        for factor, flag in cls.REDUCED_READ_FLAGS:
+            if longest // factor >= max_edge:
+                read_flag = flag
+                break
+
+        bgr = cv2.imread(image_path, read_flag)
+        if bgr is None:
+            raise ValueError("Cannot read image with OpenCV")
+
+        height, width = bgr.shape[:2]
+        if max(height, width) > max_edge:
+            scale = max_edge / max(height, width)
+            bgr = cv2.resize(
+                bgr,
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                interpolation=cv2.INTER_AREA
+            )
+        return cls(bgr, source=image_path, original_size=original_size)
+
+    @property
+    def is_proxy(self) -> bool:
+        """Whether pixels were decoded below full resolution"""
+        return max(self.bgr.shape[:2]) < max(self.original_size)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Image (height, width)"""
+        return self.bgr.shape[:2]
+
+    @property
+    def pixel_count(self) -> int:
+        height, width = self.shape
+        return height * width
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def hsv(self) -> np.ndarray:
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV)
+
+    @cached_property
+    def edges(self) -> np.ndarray:
+        return cv2.Canny(self.gray, self.CANNY_LOW, self.CANNY_HIGH)
+
+    @cached_property
+    def stats(self) -> ImageStats:
+        """Histogram-based statistics shared by all metrics"""
+        return ImageStats(self.bgr, lambda: self.hsv)
+
+    @cached_property
+    def composition(self) -> CompositionEngine:
+        """Summed-area table over the edge map"""
+        return CompositionEngine(self.edges)
+
+    @cached_property
+    def edge_pixel_count(self) -> int:
+        return int(cv2.countNonZero(self.edges))
@@ -0,0 +1,151 @@
+"""
+Proxy analysis drift harness.
+
+Analyzes images at full resolution and as reduced-resolution proxies and
+reports how far every ImageAnalysis field drifts, so a deployment can pick
+an ``analysis_max_edge`` that stays within tolerance.
+
+Usage:
+    python -m smart_photo_system.analysis.drift photo1.jpg photo2.jpg --max-edge 1024
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from ..models.state import ImageAnalysis
+
+# Largest acceptable drift per field (absolute, on the 0-1 / -3..3 scales)
+DEFAULT_TOLERANCES = {
+    "exposure": 0.05,
+    "brightness": 0.01,
+    "contrast": 0.02,
+    "saturation": 0.01,
+    "composition.edge_distribution": 0.15,
+    "color_analysis.dominant_hue": 5,
+    "color_analysis.average_saturation": 0.01,
+    "color_analysis.average_value": 0.01
+}
+
+# Fields that must match exactly
+CATEGORICAL_FIELDS = (
+    "scene_type",
+    "composition.main_subject_region",
+    "color_analysis.color_temperature"
+)
+
+
+def _edge_distribution(composition: Dict[str, Any]) -> Dict[str, float]:
+    """Normalize region edge values so resolutions are comparable"""
+    regions = composition.get("edge_density") or {}
+    total = sum(regions.values())
+    if not total:
+        return {name: 0.0 for name in regions}
+    return {name: value / total for name, value in regions.items()}
+
+
+def _lookup(analysis: ImageAnalysis, field: str) -> Any:
+    value: Any = analysis
+    for part in field.split("."):
+        value = value.get(part) if isinstance(value, dict) else getattr(value, part, None)
+    return value
+
+
+def analysis_drift(full: ImageAnalysis, proxy: ImageAnalysis) -> Dict[str, Any]:
+    """Per-field drift of a proxy analysis against the full-resolution one"""
+    drift: Dict[str, Any] = {}
+
+    for field in ("exposure", "brightness", "contrast", "saturation",
+                  "color_analysis.average_saturation", "color_analysis.average_value"):
+        reference, candidate = _lookup(full, field), _lookup(proxy, field)
+        if reference is None or candidate is None:
+            continue
+        drift[field] = abs(float(reference) - float(candidate))
+
+    reference_hue = _lookup(full, "color_analysis.dominant_hue")
+    candidate_hue = _lookup(proxy, "color_analysis.dominant_hue")
+    if reference_hue is not None and candidate_hue is not None:
+        # OpenCV hue is circular over 0-179
+        delta = abs(int(reference_hue) - int(candidate_hue)) % 180
+        drift["color_analysis.dominant_hue"] = min(delta, 180 - delta)
+
+    full_edges = _edge_distribution(full.composition)
+    proxy_edges = _edge_distribution(proxy.composition)
+    if full_edges and proxy_edges:
+        # Total variation distance between the two region distributions
+        drift["composition.edge_distribution"] = 0.5 * sum(
+            abs(full_edges[name] - proxy_edges.get(name, 0.0)) for name in full_edges
+        )
+
+    for field in CATEGORICAL_FIELDS:
+        drift[field] = _lookup(full, field) == _lookup(proxy, field)
+
+    return drift
+
+
+def check_tolerances(drift: Dict[str, Any], tolerances: Dict[str, float] = None) -> List[str]:
+    """Return human readable violations of the given tolerances"""
+    tolerances = tolerances or DEFAULT_TOLERANCES
+    violations = []
+    for field, limit in tolerances.items():
+        if field in drift and drift[field] > limit:
+            violations.append(f"{field} drift {drift[field]:.4f} exceeds {limit}")
+    for field in CATEGORICAL_FIELDS:
+        if drift.get(field) is False:
+            violations.append(f"{field} differs from full resolution")
+    return violations
+
+
+def measure_drift(image_paths: List[str], max_edge: int,
+                  tolerances: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Analyze each image at full and proxy resolution and compare"""
+    from ..nodes.image_analyzer_node import ImageAnalyzerNode
+
+    full_analyzer = ImageAnalyzerNode()
+    proxy_analyzer = ImageAnalyzerNode(max_edge=max_edge)
+    images = []
+    for image_path in image_paths:
+        started = time.perf_counter()
+        full = full_analyzer._compute_analysis(image_path)
+        full_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        proxy = proxy_analyzer._compute_analysis(image_path)
+        proxy_seconds = time.perf_counter() - started
+
+        drift = analysis_drift(full, proxy)
+        images.append({
+            "image": image_path,
+            "full_seconds": round(full_seconds, 4),
+            "proxy_seconds": round(proxy_seconds, 4),
+            "drift": drift,
+            "violations": check_tolerances(drift, tolerances)
+        })
+
+    return {
+        "max_edge": max_edge,
+        "images": images,
+        "passed": all(not image["violations"] for image in images)
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report proxy analysis drift against full resolution")
+    parser.add_argument("images", nargs="+", help="Image files to analyze")
+    parser.add_argument("--max-edge", type=int, default=1024, help="Proxy longest edge in pixels")
+    args = parser.parse_args(argv)
+
+    # Node logging goes to stdout; keep it out of the JSON report
+    output = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        report = measure_drift(args.images, args.max_edge)
+    json.dump(report, output, indent=2)
+    output.write("\n")
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
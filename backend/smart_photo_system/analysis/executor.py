@@ -0,0 +1,88 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+
+class AnalysisQueueFullError(RuntimeError):
+    """Raised when the analysis queue has no free slots"""
+
+
+class AnalysisExecutor:
+    """Bounded process pool for CPU-bound image analysis.
+
+    At most ``max_workers`` jobs run at once and up to ``max_queue`` more may
+    wait for a worker; further submissions are rejected immediately so the
+    event loop never piles up unbounded work. ``max_workers=0`` runs jobs in
+    the default thread pool instead (useful for development and debugging).
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: int = 32):
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_workers < 0 or max_queue < 0:
+            raise ValueError("max_workers and max_queue must be non-negative")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    @property
+    def concurrency(self) -> int:
+        """Jobs that actually run at once"""
+        if self.max_workers == 0:
+            # Size of the event loop's default thread pool
+            return min(32, (os.cpu_count() or 1) + 4)
+        return self.max_workers
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of running plus queued jobs"""
+        return self.concurrency + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def is_full(self) -> bool:
+        return self._pending >= self.capacity
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.max_workers == 0:
+            return None
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a picklable function in the pool and await its result"""
+        if self.is_full:
+            raise AnalysisQueueFullError(
+                f"Analysis queue is full ({self._pending} jobs pending)"
+            )
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge image); start fresh next time
+            self._pool = None
+            raise
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Shut down worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
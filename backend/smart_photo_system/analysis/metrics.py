@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class MetricSpec:
+    """One ImageAnalysis field and how to compute it"""
+    field: str
+    # ImageAnalyzerNode method computing the field from an ImageContext
+    method: str
+
+
+# Registry of analysis metrics, in ImageAnalysis field order
+METRICS: Dict[str, MetricSpec] = {
+    spec.field: spec for spec in (
+        MetricSpec("exposure", "_estimate_exposure"),
+        MetricSpec("brightness", "_compute_brightness"),
+        MetricSpec("contrast", "_compute_contrast"),
+        MetricSpec("saturation", "_compute_saturation"),
+        MetricSpec("composition", "_analyze_composition"),
+        MetricSpec("color_analysis", "_analyze_colors"),
+        MetricSpec("scene_type", "_detect_scene_type")
+    )
+}
+
+ALL_FIELDS: Tuple[str, ...] = tuple(METRICS)
+
+# Built-in profiles; deployments can add their own via the analysis_profiles config
+DEFAULT_PROFILES: Dict[str, List[str]] = {
+    "full": list(ALL_FIELDS)
+}
+
+
+def resolve_metrics(fields: Optional[Iterable[str]] = None) -> List[MetricSpec]:
+    """Validate requested fields and return their specs in canonical order"""
+    if fields is None:
+        return list(METRICS.values())
+
+    requested = set(fields)
+    unknown = requested - set(METRICS)
+    if unknown:
+        raise ValueError(
+            f"Unknown analysis fields: {', '.join(sorted(unknown))} "
+            f"(available: {', '.join(ALL_FIELDS)})"
+        )
+    return [spec for field, spec in METRICS.items() if field in requested]
@@ -0,0 +1,101 @@
+from functools import cached_property
+from typing import Callable, Tuple
+
+import cv2
+import numpy as np
+
+# ITU-R BT.601 luma weights in BGR order, as used by cv2.COLOR_BGR2GRAY
+LUMA_WEIGHTS_BGR = np.array([0.114, 0.587, 0.299])
+
+
+def histogram_moments(hist: np.ndarray) -> Tuple[float, float]:
+    """Mean and population standard deviation of a value histogram"""
+    total = hist.sum()
+    if total == 0:
+        return 0.0, 0.0
+    values = np.arange(hist.shape[-1], dtype=np.float64)
+    mean = float(np.dot(values, hist) / total)
+    variance = float(np.dot(values * values, hist) / total) - mean * mean
+    return mean, float(np.sqrt(max(variance, 0.0)))
+
+
+def _channel_histograms(img: np.ndarray, bins: Tuple[int, ...]) -> Tuple[np.ndarray, ...]:
+    """One histogram per channel, each from its own cv2.calcHist pass over the image.
+
+    Three channel passes beat a single pass over channel-offset bins
+    (np.bincount), which needs a widened index copy of every pixel first.
+    """
+    return tuple(
+        cv2.calcHist([img], [channel], None, [size], [0, size]).ravel().astype(np.float64)
+        for channel, size in enumerate(bins)
+    )
+
+
+class ImageStats:
+    """Image statistics derived from per-channel histogram moments.
+
+    Histograms are built once per image, on first use; brightness, contrast, saturation,
+    average value, luma and the blue/red ratio are all O(bins) afterwards
+    instead of a full-image pass each.
+    """
+
+    def __init__(self, bgr: np.ndarray, hsv_source: Callable[[], np.ndarray]):
+        self._bgr = bgr
+        # HSV is only converted if an HSV-derived statistic is requested
+        self._hsv_source = hsv_source
+
+    @cached_property
+    def bgr_hists(self) -> Tuple[np.ndarray, ...]:
+        return _channel_histograms(self._bgr, (256, 256, 256))
+
+    @cached_property
+    def hsv_hists(self) -> Tuple[np.ndarray, ...]:
+        # OpenCV 8-bit hue spans 0-179
+        return _channel_histograms(self._hsv_source(), (180, 256, 256))
+
+    @cached_property
+    def _bgr_moments(self) -> Tuple[np.ndarray, np.ndarray]:
+        moments = [histogram_moments(hist) for hist in self.bgr_hists]
+        return (
+            np.array([mean for mean, _ in moments]),
+            np.array([std for _, std in moments])
+        )
+
+    @property
+    def channel_means(self) -> np.ndarray:
+        return self._bgr_moments[0]
+
+    @property
+    def channel_stds(self) -> np.ndarray:
+        return self._bgr_moments[1]
+
+    @property
+    def brightness(self) -> float:
+        """Mean of channel means, normalized to 0-1"""
+        return float(self.channel_means.mean() / 255.0)
+
+    @property
+    def contrast(self) -> float:
+        """Mean of channel standard deviations, normalized to 0-1"""
+        return float(self.channel_stds.mean() / 255.0)
+
+    @property
+    def luma_mean(self) -> float:
+        """Mean grayscale level (0-255), equal to the gray image mean up to rounding"""
+        return float(np.dot(LUMA_WEIGHTS_BGR, self.channel_means))
+
+    @property
+    def saturation(self) -> float:
+        return histogram_moments(self.hsv_hists[1])[0] / 255.0
+
+    @property
+    def average_value(self) -> float:
+        return histogram_moments(self.hsv_hists[2])[0] / 255.0
+
+    @property
+    def dominant_hue(self) -> int:
+        return int(np.argmax(self.hsv_hists[0]))
+
+    @property
+    def blue_red_ratio(self) -> float:
+        return float(self.channel_means[0] / (self.channel_means[2] + 1e-6))  # Avoid division by zero
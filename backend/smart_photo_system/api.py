@@ -1,15 +1,26 @@
 import os
+import json
+import time
 import uuid
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, AsyncIterator
 import asyncio
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request, UploadFile, File, Form, Query, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
-from .models.state import PhotoSystemState, CameraParams
+from .models.state import PhotoSystemState, CameraParams, BracketSettings
 from .graph import SmartPhotoGraph
+from .body_limit import BodySizeLimitMiddleware
+from .jobs import CaptureJob, CaptureJobQueue, CaptureQueueFullError
+from .media import DerivativeCache, UndecodableImageError, conditional_file_response
+from .nodes import UploadTooLargeError
+from .sessions import (
+    SessionStore, SessionEventBus, SessionExpiryScheduler, create_session_store, create_event_bus,
+    filter_index_name, state_event, deleted_event
+)
+from .sessions.events import EventSubscription
 
 
 # API request/response models
@@ -18,6 +29,12 @@ class RefinementRequest(BaseModel):
     user_input: str
 
 
+# Session fields a capture job owns; everything else belongs to other requests
+CAPTURE_FIELDS = ("captured_photo", "bracket", "bracket_frames", "device_id")
+# Also written by a capture job, but only if no other request changed the session meanwhile
+CAPTURE_STATUS_FIELDS = ("current_step", "error_message")
+
+
 class SessionResponse(BaseModel):
     session_id: str
     current_step: str
@@ -30,13 +47,32 @@ class StatusResponse(BaseModel):
     analysis: Optional[Dict[str, Any]] = None
     final_params: Optional[Dict[str, Any]] = None
     refinements: list = []
+    refinement_count: int = 0
+    refinement_position: int = 0
+    # Pass as refinements_before to fetch older refinements; None when the window reaches the start
+    refinements_cursor: Optional[int] = None
     captured_photo: Optional[str] = None
+    # Frames of a bracketed capture, each served by /photo/{session_id}?frame=index
+    bracket_frames: list = []
     error_message: Optional[str] = None
 
 
+class BatchItem(BaseModel):
+    """Image queued for batch analysis"""
+    index: int
+    filename: str
+    path: Optional[str] = None
+    photo_hash: Optional[str] = None
+    temporary: bool = False
+    error: Optional[str] = None
+
+
 class SmartPhotoAPI:
     """FastAPI interface for smart photo system"""
     
+    # File extensions picked up by directory batch analysis
+    BATCH_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".heic", ".webp", ".bmp", ".tif", ".tiff"}
+    
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config or {}
         
@@ -46,23 +82,74 @@ class SmartPhotoAPI:
             description="Smart photo system based on LangGraph",
             version="1.0.0"
         )
+        # Upload bodies are capped while they stream in, declared length or not
+        self.app.add_middleware(BodySizeLimitMiddleware, limit_for=self._body_limit)
+        
+        # Session storage (in-memory, or Redis for multiple workers/hosts)
+        self.sessions: SessionStore = create_session_store(self.config)
         
-        # Session storage (production environment should use Redis or database)
-        self.sessions: Dict[str, PhotoSystemState] = {}
+        # Idle/absolute session TTLs enforced by a background expiry task
+        self.session_expiry = SessionExpiryScheduler(
+            idle_ttl=self.config.get("session_idle_ttl", 3600),
+            absolute_ttl=self.config.get("session_max_age", 86400)
+        )
+        self._expiry_task: Optional[asyncio.Task] = None
         
         # Create graph instance
         self.photo_graph = SmartPhotoGraph(config)
         
+        # Resized copies of captured photos (e.g. gallery thumbnails)
+        self.photo_derivatives = DerivativeCache(
+            cache_dir=self.config.get("photo_cache_dir")
+            or os.path.join(self.config.get("output_dir", "/tmp/smart_photo_output"), ".derivatives"),
+            max_bytes=self.config.get("photo_cache_max_bytes", 256 * 1024 * 1024)
+        )
+        
+        # Progress events pushed to /events listeners
+        self.events: SessionEventBus = create_event_bus(self.sessions)
+        self.photo_graph.attach_events(self.events)
+        
+        # Capture jobs run in the background so requests never wait on the camera
+        self.capture_jobs = CaptureJobQueue(
+            self._run_capture_job,
+            workers_per_device=self.config.get("capture_workers_per_device", 1),
+            max_queue=self.config.get("capture_max_queue", 16),
+            on_update=self._publish_job
+        )
+        
         # Setup routes
         self._setup_routes()
     
     def _setup_routes(self):
         """Setup API routes"""
         
+        @self.app.on_event("startup")
+        async def startup():
+            """Start session expiry"""
+            if self.session_expiry.enabled:
+                self._expiry_task = asyncio.create_task(self._expire_sessions_loop())
+        
+        @self.app.on_event("shutdown")
+        async def shutdown():
+            """Release graph resources"""
+            if self._expiry_task:
+                self._expiry_task.cancel()
+            await self.capture_jobs.shutdown()
+            await self.photo_graph.aclose()
+            await self.events.close()
+            await self.sessions.close()
+        
         @self.app.post("/upload", response_model=SessionResponse)
-        async def upload_photo(file: UploadFile = File(...)):
+        async def upload_photo(
+            file: UploadFile = File(...),
+            fields: Optional[str] = None,
+            profile: Optional[str] = None
+        ):
             """Upload reference photo and start analysis"""
             try:
+                # Subset of analysis fields to compute (comma separated) or a named profile
+                analysis_fields = self._resolve_analysis_fields(fields, profile)
+                
                 # Create new session
                 session_id = str(uuid.uuid4())
                 
@@ -70,16 +157,24 @@ class SmartPhotoAPI:
                 if not file.content_type.startswith('image/'):
                     raise HTTPException(status_code=400, detail="Only image files are supported")
                 
-                # Save uploaded file
-                file_content = await file.read()
-                saved_path = await self.photo_graph.upload_node.save_uploaded_file(
-                    file_content, file.filename
+                # Fail fast instead of queueing more work than the pool can take
+                if self.photo_graph.analysis_executor.is_full:
+                    raise HTTPException(status_code=503, detail="Analysis queue is full, please retry later")
+                
+                # Stream uploaded file to disk
+                saved_path, photo_hash = await self.photo_graph.upload_node.save_uploaded_file(
+                    file, file.filename
                 )
                 
                 # Create initial state
+                now = time.time()
                 state = PhotoSystemState(
                     session_id=session_id,
+                    created_at=now,
+                    last_access=now,
                     photo_ref=saved_path,
+                    photo_hash=photo_hash,
+                    analysis_fields=analysis_fields,
                     current_step="analyze"
                 )
                 
@@ -87,7 +182,7 @@ class SmartPhotoAPI:
                 analyzed_state = await self.photo_graph.run_single_step(state, "analyze")
                 
                 # Save session
-                self.sessions[session_id] = analyzed_state
+                await self._save_session(analyzed_state)
                 
                 return SessionResponse(
                     session_id=session_id,
@@ -95,35 +190,108 @@ class SmartPhotoAPI:
                     error_message=analyzed_state.error_message
                 )
                 
+            except HTTPException:
+                raise
+            except UploadTooLargeError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
             except Exception as e:
                 raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
         
+        @self.app.post("/analyze/batch")
+        async def analyze_batch(
+            files: Optional[List[UploadFile]] = File(None),
+            directory: Optional[str] = Form(None),
+            fields: Optional[str] = Form(None),
+            profile: Optional[str] = Form(None)
+        ):
+            """Analyze many images, streaming one NDJSON line per image as it finishes"""
+            if not files and not directory:
+                raise HTTPException(status_code=400, detail="Provide image files or a directory")
+            
+            max_files = self.config.get("batch_max_files", 500)
+            items: List[BatchItem] = []
+            analysis_fields = self._resolve_analysis_fields(fields, profile)
+            
+            try:
+                # Uploads are saved before streaming starts; the request body is gone afterwards
+                for upload in files or []:
+                    if len(items) >= max_files:
+                        raise HTTPException(status_code=400, detail=f"At most {max_files} images per batch")
+                    item = BatchItem(index=len(items), filename=upload.filename or "", temporary=True)
+                    items.append(item)
+                    if not (upload.content_type or "").startswith('image/'):
+                        item.error = "Only image files are supported"
+                        continue
+                    try:
+                        item.path, item.photo_hash = await self.photo_graph.upload_node.save_uploaded_file(
+                            upload, upload.filename
+                        )
+                    except ValueError as e:
+                        # Invalid images are reported on their own line, not fatal to the batch
+                        item.error = str(e)
+                
+                if directory:
+                    for path in self._resolve_batch_directory(directory):
+                        if len(items) >= max_files:
+                            raise HTTPException(status_code=400, detail=f"At most {max_files} images per batch")
+                        # Hashed by the item's own task, so the first results stream without waiting
+                        items.append(BatchItem(index=len(items), filename=os.path.basename(path), path=path))
+            except Exception as e:
+                self.photo_graph.upload_node.cleanup_temp_files(
+                    [item.path for item in items if item.temporary and item.path]
+                )
+                if isinstance(e, HTTPException):
+                    raise
+                raise HTTPException(status_code=500, detail=f"Batch upload failed: {str(e)}")
+            
+            return StreamingResponse(
+                self._stream_batch(items, analysis_fields), media_type="application/x-ndjson"
+            )
+        
         @self.app.get("/status/{session_id}", response_model=StatusResponse)
-        async def get_status(session_id: str):
-            """Get session status"""
-            if session_id not in self.sessions:
-                raise HTTPException(status_code=404, detail="Session not found")
+        async def get_status(
+            session_id: str,
+            refinements_limit: int = Query(None, ge=0, le=500),
+            refinements_before: Optional[int] = Query(None, ge=0)
+        ):
+            """Get session status with a window of the most recent refinements"""
+            state = await self._get_session(session_id)
             
-            state = self.sessions[session_id]
+            # Bounded window of the refinement log, newest last
+            if refinements_limit is None:
+                refinements_limit = self.config.get("status_refinement_window", 20)
+            end = len(state.refinements) if refinements_before is None else min(refinements_before, len(state.refinements))
+            start = max(end - refinements_limit, 0)
+            window = [
+                {"index": index, "undone": index >= state.refinement_position, **state.refinements[index].model_dump(exclude={"previous", "applied"})}
+                for index in range(start, end)
+            ]
             
             return StatusResponse(
                 session_id=session_id,
                 current_step=state.current_step,
                 analysis=state.analysis.model_dump() if state.analysis else None,
                 final_params=state.final_params.model_dump() if state.final_params else None,
-                refinements=[r.model_dump() for r in state.refinements],
+                refinements=window,
+                refinement_count=len(state.refinements),
+                refinement_position=state.refinement_position,
+                refinements_cursor=start if start > 0 else None,
                 captured_photo=state.captured_photo,
+                bracket_frames=[
+                    {"index": index, "url": f"/photo/{session_id}?frame={index}", **frame.model_dump(exclude={"path"})}
+                    for index, frame in enumerate(state.bracket_frames)
+                ],
                 error_message=state.error_message
             )
         
         @self.app.post("/refine", response_model=SessionResponse)
         async def refine_parameters(request: RefinementRequest):
             """Process user's refinement instructions"""
-            if request.session_id not in self.sessions:
-                raise HTTPException(status_code=404, detail="Session not found")
+            state = await self._get_session(request.session_id)
             
             try:
-                state = self.sessions[request.session_id]
                 
                 # Process refinement
                 updated_state = await self.photo_graph.process_refinement(
@@ -131,7 +299,7 @@ class SmartPhotoAPI:
                 )
                 
                 # Update session
-                self.sessions[request.session_id] = updated_state
+                await self._save_session(updated_state)
                 
                 return SessionResponse(
                     session_id=request.session_id,
@@ -142,105 +310,169 @@ class SmartPhotoAPI:
             except Exception as e:
                 raise HTTPException(status_code=500, detail=f"Refinement failed: {str(e)}")
         
-        @self.app.post("/capture/{session_id}", response_model=SessionResponse)
-        async def capture_photo(session_id: str, background_tasks: BackgroundTasks):
-            """Trigger photo capture"""
-            if session_id not in self.sessions:
-                raise HTTPException(status_code=404, detail="Session not found")
+        @self.app.post("/refine/{session_id}/undo", response_model=SessionResponse)
+        async def undo_refinement(session_id: str):
+            """Revert the most recent refinement"""
+            state = await self._get_session(session_id)
+            updated_state = await self.photo_graph.undo_refinement(state)
+            await self._save_session(updated_state)
+            
+            return SessionResponse(
+                session_id=session_id,
+                current_step=updated_state.current_step,
+                error_message=updated_state.error_message
+            )
+        
+        @self.app.post("/refine/{session_id}/redo", response_model=SessionResponse)
+        async def redo_refinement(session_id: str):
+            """Re-apply the most recently undone refinement"""
+            state = await self._get_session(session_id)
+            updated_state = await self.photo_graph.redo_refinement(state)
+            await self._save_session(updated_state)
+            
+            return SessionResponse(
+                session_id=session_id,
+                current_step=updated_state.current_step,
+                error_message=updated_state.error_message
+            )
+        
+        @self.app.post("/capture/{session_id}", status_code=202)
+        async def capture_photo(
+            session_id: str,
+            frames: int = Query(1, ge=1, le=9, description="Frames to capture; more than one takes a bracketed burst"),
+            bracket_step: float = Query(1.0, gt=0, le=3, description="Stops between bracket frames"),
+            bracket_param: str = Query("exposure", pattern="^(exposure|iso)$", description="Parameter the bracket varies")
+        ):
+            """Queue photo capture; poll /jobs/{job_id} or follow /events/{session_id}"""
+            state = await self._get_session(session_id)
+            bracket = BracketSettings(frames=frames, step=bracket_step, param=bracket_param) if frames > 1 else None
+            
+            # Stay on the session's device unless its queue is full, else take the least-loaded one
+            preferred = state.device_id
+            if preferred and self.capture_jobs.pending(preferred) >= self.capture_jobs.capacity:
+                preferred = None
+            device = self.photo_graph.devices.select(preferred, load=self.capture_jobs.pending)
             
             try:
-                state = self.sessions[session_id]
-                
-                # First control iPhone camera
-                controlled_state = await self.photo_graph.run_single_step(state, "control")
-                
-                if controlled_state.error_message:
-                    self.sessions[session_id] = controlled_state
-                    return SessionResponse(
-                        session_id=session_id,
-                        current_step=controlled_state.current_step,
-                        error_message=controlled_state.error_message
-                    )
-                
-                # Then capture photo
-                captured_state = await self.photo_graph.run_single_step(controlled_state, "capture")
-                
-                # Update session
-                self.sessions[session_id] = captured_state
-                
-                # Background task: clean up old photos
-                background_tasks.add_task(self.photo_graph.capture_node.cleanup_photos)
-                
-                return SessionResponse(
-                    session_id=session_id,
-                    current_step=captured_state.current_step,
-                    error_message=captured_state.error_message
-                )
-                
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Photo capture failed: {str(e)}")
+                job = self.capture_jobs.submit(session_id, device=device.name, bracket=bracket)
+            except CaptureQueueFullError as e:
+                raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+            await self._publish_job(job)
+            
+            return JSONResponse(
+                status_code=202,
+                content={**job.model_dump(), "status_url": f"/jobs/{job.job_id}"},
+                headers={"Location": f"/jobs/{job.job_id}"}
+            )
         
-        @self.app.get("/photo/{session_id}")
-        async def get_captured_photo(session_id: str):
-            """Get captured photo"""
-            if session_id not in self.sessions:
-                raise HTTPException(status_code=404, detail="Session not found")
+        @self.app.get("/jobs/{job_id}", response_model=CaptureJob)
+        async def get_job(job_id: str):
+            """Get capture job status, from this worker or as last published by the one running it"""
+            job = self.capture_jobs.get(job_id)
+            if job is None:
+                data = await self.sessions.get_job(job_id)
+                job = CaptureJob.model_validate_json(data) if data else None
+            if job is None:
+                raise HTTPException(status_code=404, detail="Job not found")
+            return job
+        
+        @self.app.get("/events/{session_id}")
+        async def session_events(session_id: str, request: Request):
+            """Server-sent events of step transitions, errors and the captured photo URL"""
+            # Subscribe before reading the state so no transition falls in between
+            subscription = await self.events.subscribe(session_id)
+            try:
+                state = await self._get_session(session_id)
+            except BaseException:
+                await subscription.close()
+                raise
             
-            state = self.sessions[session_id]
+            return StreamingResponse(
+                self._stream_events(request, subscription, state),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
+        @self.app.get("/photo/{session_id}")
+        async def get_captured_photo(
+            request: Request,
+            session_id: str,
+            w: Optional[int] = Query(None, ge=16, le=4096, description="Resize to this width (keeps aspect ratio)"),
+            frame: Optional[int] = Query(None, ge=0, description="Bracket frame index (default: the middle frame)")
+        ):
+            """Get captured photo, optionally as a resized derivative"""
+            state = await self._get_session(session_id)
             
             if not state.captured_photo:
                 raise HTTPException(status_code=404, detail="No captured photo found")
             
-            if not os.path.exists(state.captured_photo):
+            source = state.captured_photo
+            filename = f"captured_{session_id}"
+            if frame is not None:
+                if frame >= len(state.bracket_frames):
+                    raise HTTPException(status_code=404, detail="Bracket frame not found")
+                source = state.bracket_frames[frame].path
+                filename += f"_f{frame}"
+            
+            if not os.path.exists(source):
                 raise HTTPException(status_code=404, detail="Photo file does not exist")
             
-            return FileResponse(
-                state.captured_photo,
-                media_type='image/jpeg',
-                filename=f"captured_{session_id}.jpg"
-            )
+            path = source
+            if w:
+                try:
+                    path = await self.photo_derivatives.get(source, w)
+                except UndecodableImageError as e:
+                    # e.g. a simulated capture, which holds no image data
+                    raise HTTPException(status_code=415, detail=f"Photo cannot be resized: {str(e)}")
+                except Exception as e:
+                    raise HTTPException(status_code=500, detail=f"Resize failed: {str(e)}")
+                filename += f"_w{w}"
+            filename += ".jpg"
+            
+            return conditional_file_response(request, path, media_type='image/jpeg', filename=filename)
         
         @self.app.delete("/session/{session_id}")
         async def delete_session(session_id: str):
             """Delete session and related files"""
-            if session_id not in self.sessions:
+            state = await self.sessions.delete(session_id)
+            if state is None:
                 raise HTTPException(status_code=404, detail="Session not found")
             
-            state = self.sessions[session_id]
-            
             # Clean up temporary files
-            files_to_delete = []
-            if state.photo_ref:
-                files_to_delete.append(state.photo_ref)
-            if state.captured_photo:
-                files_to_delete.append(state.captured_photo)
-            files_to_delete.extend(state.temp_files)
-            
-            for file_path in files_to_delete:
-                try:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                except Exception as e:
-                    print(f"Failed to delete file {file_path}: {str(e)}")
-            
-            # Delete session
-            del self.sessions[session_id]
+            self.session_expiry.discard(session_id)
+            self._delete_session_files(state)
+            self.events.publish(session_id, deleted_event(session_id))
             
             return {"message": "Session deleted"}
         
         @self.app.get("/sessions")
-        async def list_sessions():
-            """List all active sessions"""
-            sessions_info = []
-            for session_id, state in self.sessions.items():
-                sessions_info.append({
-                    "session_id": session_id,
+        async def list_sessions(
+            limit: int = Query(50, ge=1, le=500),
+            cursor: Optional[str] = None,
+            current_step: Optional[str] = None,
+            has_error: Optional[bool] = None,
+            has_photo: Optional[bool] = None
+        ):
+            """List active sessions in creation order, one page at a time"""
+            index = filter_index_name(current_step, has_error, has_photo)
+            try:
+                states, next_cursor = await self.sessions.list_page(limit, cursor, index)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            
+            sessions_info = [
+                {
+                    "session_id": state.session_id,
                     "current_step": state.current_step,
                     "has_error": state.error_message is not None,
-                    "has_photo": state.captured_photo is not None
-                })
+                    "has_photo": state.captured_photo is not None,
+                    "created_at": state.created_at,
+                    "last_access": state.last_access
+                }
+                for state in states
+            ]
             
-            return {"sessions": sessions_info}
+            return {"sessions": sessions_info, "next_cursor": next_cursor}
         
         @self.app.get("/graph/info")
         async def get_graph_info():
@@ -250,32 +482,292 @@ class SmartPhotoAPI:
                 "supported_steps": self.photo_graph.get_supported_steps()
             }
         
+        @self.app.get("/metrics")
+        async def metrics():
+            """Prometheus metrics: per-step latency histograms, in-flight gauges, error and path counters"""
+            return Response(content=self.photo_graph.metrics.render(), media_type=self.photo_graph.metrics.content_type)
+        
         @self.app.get("/health")
         async def health_check():
             """Health check"""
             return {
                 "status": "healthy",
                 "timestamp": datetime.now().isoformat(),
-                "active_sessions": len(self.sessions)
+                "active_sessions": await self.sessions.count(),
+                "capture_jobs": self.capture_jobs.stats(),
+                "photo_derivatives": self.photo_derivatives.stats(),
+                "device_http": self.photo_graph.device_client.stats(),
+                "device_params": self.photo_graph.applied_params.stats(),
+                "devices": self.photo_graph.devices.stats(),
+                "analysis_queue": self.photo_graph.analysis_executor.stats(),
+                "analysis_cache": self.photo_graph.analysis_cache.stats()
             }
     
-    def cleanup_old_sessions(self, max_age_hours: int = 24):
-        """Clean up old sessions"""
-        current_time = datetime.now()
-        sessions_to_delete = []
-        
-        for session_id, state in self.sessions.items():
-            # Assumes we have creation time, actual implementation needs created_at field in state
-            # Simplified version: directly clean all sessions with error status
-            if state.error_message and state.current_step in ["upload", "analyze"]:
-                sessions_to_delete.append(session_id)
-        
-        for session_id in sessions_to_delete:
+    async def _get_session(self, session_id: str) -> PhotoSystemState:
+        """Load a session and refresh its idle deadline, or answer 404"""
+        state = await self.sessions.get(session_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        if self.session_expiry.is_expired(state):
+            # Expired but not yet evicted (e.g. scheduled on another worker)
+            await self._expire_session(session_id)
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        # Only the access time is written; the state itself is left alone
+        state.last_access = time.time()
+        await self.sessions.touch(session_id, state.last_access)
+        self.session_expiry.schedule(state)
+        return state
+    
+    async def _save_session(self, state: PhotoSystemState):
+        """Store a session and push back its idle deadline"""
+        state.last_access = time.time()
+        if state.created_at is None:
+            state.created_at = state.last_access
+        await self.sessions.save(state)
+        self.session_expiry.schedule(state)
+    
+    async def _expire_session(self, session_id: str):
+        """Delete a session and its files"""
+        self.session_expiry.discard(session_id)
+        state = await self.sessions.delete(session_id)
+        if state is not None:
+            self._delete_session_files(state)
+            self.events.publish(session_id, deleted_event(session_id))
+            print(f"Expired session: {session_id}")
+    
+    def _delete_session_files(self, state: PhotoSystemState):
+        """Remove the reference photo, captured photo and temp files of a session"""
+        files_to_delete = []
+        if state.photo_ref:
+            files_to_delete.append(state.photo_ref)
+        if state.captured_photo:
+            files_to_delete.append(state.captured_photo)
+        files_to_delete.extend(frame.path for frame in state.bracket_frames if frame.path != state.captured_photo)
+        files_to_delete.extend(state.temp_files)
+        
+        for file_path in files_to_delete:
+            try:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            except Exception as e:
+                print(f"Failed to delete file {file_path}: {str(e)}")
+    
+    def _resolve_analysis_fields(self, fields: Optional[str], profile: Optional[str]) -> Optional[List[str]]:
+        """Parse the fields/profile request parameters, answering 400 on unknown names"""
+        requested = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+        try:
+            return self.photo_graph.analyzer_node.resolve_fields(requested, profile)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    def _body_limit(self, scope: dict) -> Optional[int]:
+        """Largest request body accepted by upload routes (None = no limit)"""
+        max_bytes = self.photo_graph.upload_node.max_upload_bytes
+        if not max_bytes or scope.get("method") != "POST":
+            return None
+        path = scope.get("path")
+        if path == "/upload":
+            files = 1
+        elif path == "/analyze/batch":
+            files = self.config.get("batch_max_files", 500)
+        else:
+            return None
+        # Allow some slack for multipart boundaries and form fields
+        return max_bytes * files + 64 * 1024
+    
+    def _resolve_batch_directory(self, directory: str) -> List[str]:
+        """List image files in a server-side directory under the configured batch root"""
+        batch_root = self.config.get("batch_root")
+        if not batch_root:
+            raise HTTPException(status_code=400, detail="Directory batch analysis is not enabled")
+        
+        root = os.path.realpath(batch_root)
+        target = os.path.realpath(os.path.join(root, directory))
+        if os.path.commonpath([root, target]) != root:
+            raise HTTPException(status_code=400, detail="Directory is outside the batch root")
+        if not os.path.isdir(target):
+            raise HTTPException(status_code=404, detail="Directory not found")
+        
+        return [
+            os.path.join(target, name)
+            for name in sorted(os.listdir(target))
+            if os.path.splitext(name)[1].lower() in self.BATCH_IMAGE_EXTENSIONS
+            and os.path.isfile(os.path.join(target, name))
+        ]
+    
+    async def _stream_batch(self, items: List[BatchItem], fields: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+        """Fan batch items out to the analysis pool and yield NDJSON lines in completion order"""
+        analyzer = self.photo_graph.analyzer_node
+        # Keep this batch within the pool's real worker count so it never fills the shared queue
+        limit = asyncio.Semaphore(self.photo_graph.analysis_executor.concurrency)
+        
+        async def analyze(item: BatchItem) -> Dict[str, Any]:
+            result = {"index": item.index, "filename": item.filename, "photo_hash": item.photo_hash}
+            if item.error:
+                result.update(analysis=None, recommended_params=None, error=item.error)
+                return result
             try:
-                del self.sessions[session_id]
-                print(f"Cleaned session: {session_id}")
+                async with limit:
+                    if item.photo_hash is None:
+                        item.photo_hash = await self.photo_graph.upload_node.hash_file(item.path)
+                        result["photo_hash"] = item.photo_hash
+                    analysis, params = await analyzer.analyze_with_params(item.path, item.photo_hash, fields)
+                result.update(analysis=analysis.model_dump(), recommended_params=params.model_dump(), error=None)
+            except Exception as e:
+                result.update(analysis=None, recommended_params=None, error=str(e))
+            finally:
+                if item.temporary:
+                    self.photo_graph.upload_node.cleanup_temp_files([item.path])
+            return result
+        
+        tasks = [asyncio.ensure_future(analyze(item)) for item in items]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                yield (json.dumps(result) + "\n").encode("utf-8")
+        finally:
+            # Client went away: stop remaining work and drop uploaded files
+            for task in tasks:
+                task.cancel()
+            pending = [
+                item.path for item, task in zip(items, tasks)
+                if item.temporary and item.path and not task.done()
+            ]
+            self.photo_graph.upload_node.cleanup_temp_files(pending)
+    
+    async def _publish_job(self, job: CaptureJob):
+        """Share a job's status with other workers through the session store"""
+        await self.sessions.save_job(job.job_id, job.model_dump_json(), self.config.get("capture_job_ttl", 86400))
+    
+    async def _run_capture_job(self, job: CaptureJob) -> CaptureJob:
+        """Control the camera and capture for a queued job"""
+        state = await self.sessions.get(job.session_id)
+        if state is None:
+            job.error_message = "Session not found"
+            return job
+        # Work on a copy: requests handled while the camera is busy keep editing the stored session
+        state = state.model_copy(deep=True)
+        revision = state.revision
+        
+        # First control iPhone camera, then capture photo; errors from earlier steps do not count
+        state.error_message = None
+        state.device_id = job.device
+        state.bracket = job.bracket
+        state = await self.photo_graph.run_single_step(state, "control")
+        if not state.error_message:
+            state = await self.photo_graph.run_single_step(state, "capture")
+        
+        # Merge what capture owns into the current session in one atomic update, so changes
+        # made meanwhile (e.g. a refinement) survive; the session may also have been deleted
+        def merge(current: PhotoSystemState):
+            for field in CAPTURE_FIELDS:
+                setattr(current, field, getattr(state, field))
+            if current.revision == revision:
+                for field in CAPTURE_STATUS_FIELDS:
+                    setattr(current, field, getattr(state, field))
+            # Otherwise the step and error set by the later request stand, and parameters refined
+            # during the capture are pushed by the next one (the device's applied set is tracked)
+            current.last_access = time.time()
+        
+        current = await self.sessions.update(job.session_id, merge)
+        if current is not None:
+            self.session_expiry.schedule(current)
+        
+        job.current_step = state.current_step
+        job.error_message = state.error_message
+        
+        # Clean up old photos, never dropping frames of the burst just taken
+        keep_latest = max(10, job.bracket.frames if job.bracket else 1)
+        await asyncio.to_thread(self.photo_graph.capture_node.cleanup_photos, keep_latest)
+        return job
+    
+    async def _stream_events(self, request: Request, subscription: EventSubscription,
+                             state: PhotoSystemState) -> AsyncIterator[bytes]:
+        """Format session events as SSE, starting with the current state"""
+        heartbeat = self.config.get("events_heartbeat_seconds", 15)
+        event: Optional[Dict[str, Any]] = state_event(state)
+        try:
+            while True:
+                if event is None:
+                    if await request.is_disconnected():
+                        break
+                    # Comment line keeps proxies from closing an idle stream
+                    yield b": keep-alive\n\n"
+                else:
+                    yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n".encode("utf-8")
+                    if event["event"] == "deleted":
+                        break
+                event = await subscription.get(heartbeat)
+        finally:
+            await subscription.close()
+    
+    async def cleanup_old_sessions(self):
+        """Evict expired sessions and schedule the rest (full scan, run at startup)"""
+        expired = []
+        
+        async for state in self.sessions.iter_states():
+            if self.session_expiry.is_expired(state):
+                expired.append(state.session_id)
+            else:
+                self.session_expiry.schedule(state)
+        
+        for session_id in expired:
+            try:
+                await self._expire_session(session_id)
             except Exception as e:
                 print(f"Failed to clean session {session_id}: {str(e)}")
+    
+    async def _sweep_shared_sessions(self, batch: int = 100):
+        """Expire overdue sessions found in a shared store, whichever worker last used them"""
+        while True:
+            now = time.time()
+            idle_ttl, absolute_ttl = self.session_expiry.idle_ttl, self.session_expiry.absolute_ttl
+            candidates = await self.sessions.expired_ids(
+                now - idle_ttl if idle_ttl else None,
+                now - absolute_ttl if absolute_ttl else None,
+                batch
+            )
+            expired = 0
+            for session_id in candidates:
+                state = await self.sessions.get(session_id)
+                # Another worker may have used or removed it since the scan
+                if state is not None and self.session_expiry.is_expired(state, now):
+                    await self._expire_session(session_id)
+                    expired += 1
+            if len(candidates) < batch or not expired:
+                return
+    
+    async def _expire_sessions_loop(self):
+        """Evict sessions as their deadlines pass"""
+        interval = self.config.get("session_expiry_interval", 30)
+        try:
+            await self.cleanup_old_sessions()
+        except Exception as e:
+            print(f"Session cleanup failed: {str(e)}")
+        
+        while True:
+            next_deadline = self.session_expiry.next_deadline()
+            delay = interval if next_deadline is None else min(max(next_deadline - time.time(), 0), interval)
+            await asyncio.sleep(delay)
+            
+            try:
+                await self._sweep_shared_sessions()
+            except Exception as e:
+                print(f"Shared session sweep failed: {str(e)}")
+            
+            for session_id in self.session_expiry.pop_expired():
+                try:
+                    # Another worker may have used the session since it was scheduled here
+                    state = await self.sessions.get(session_id)
+                    if state is None:
+                        continue
+                    if self.session_expiry.is_expired(state):
+                        await self._expire_session(session_id)
+                    else:
+                        self.session_expiry.schedule(state)
+                except Exception as e:
+                    print(f"Failed to expire session {session_id}: {str(e)}")
 
 
 def create_app(config: Dict[str, Any] = None) -> FastAPI:
@@ -0,0 +1,69 @@
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+
+class RequestBodyTooLargeError(HTTPException):
+    """Raised from the request body stream once it passes the route's limit"""
+
+    def __init__(self):
+        super().__init__(status_code=413, detail="Request body exceeds the maximum upload size")
+
+
+class BodySizeLimitMiddleware:
+    """ASGI middleware capping request bodies while they are received.
+
+    ``limit_for`` maps a request scope to its byte limit (None = unlimited).
+    A larger declared Content-Length is answered with 413 before any body is
+    read; otherwise bytes are counted as they arrive, so chunked requests
+    without a Content-Length are cut off as soon as they pass the limit,
+    before the multipart parser spools the rest to disk.
+    """
+
+    def __init__(self, app: Any, limit_for: Callable[[dict], Optional[int]]):
+        self.app = app
+        self.limit_for = limit_for
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        limit = self.limit_for(scope) if scope["type"] == "http" else None
+        if not limit:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > limit:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive() -> dict:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise RequestBodyTooLargeError()
+            return message
+
+        async def tracked_send(message: dict):
+            nonlocal started
+            started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except RequestBodyTooLargeError:
+            # Normally turned into a 413 by the app; only reached if it escaped the router
+            if started:
+                raise
+            await self._reject(scope, receive, send)
+
+    @staticmethod
+    async def _reject(scope: dict, receive: Callable, send: Callable):
+        error = RequestBodyTooLargeError()
+        response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+        await response(scope, receive, send)
@@ -0,0 +1,6 @@
+from .breaker import CircuitBreaker, DeviceUnavailableError
+from .http_client import DeviceHTTPClient
+from .param_cache import AppliedParamsCache, device_key
+from .pool import CameraDevice, DevicePool
+
+__all__ = ['CircuitBreaker', 'DeviceUnavailableError', 'DeviceHTTPClient', 'AppliedParamsCache', 'device_key', 'CameraDevice', 'DevicePool']
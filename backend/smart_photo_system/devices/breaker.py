@@ -0,0 +1,71 @@
+import time
+from typing import Optional
+
+
+class DeviceUnavailableError(ConnectionError):
+    """Raised instead of calling a device whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Failure tracker for one device endpoint.
+
+    After ``failure_threshold`` consecutive transport failures the breaker
+    opens and calls are refused immediately. Once the open period has passed
+    a single trial call is let through (half-open): success closes the
+    breaker, failure re-opens it for twice as long, up to ``max_delay``.
+    """
+
+    def __init__(self, failure_threshold: int = 3, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = "closed"  # closed, open, half_open
+        self.failures = 0
+        self.opened = 0  # Consecutive openings, drives the backoff
+        self.retry_at = 0.0
+        self.last_error: Optional[str] = None
+
+    def _delay(self) -> float:
+        return min(self.max_delay, self.base_delay * 2 ** max(self.opened - 1, 0))
+
+    @property
+    def is_open(self) -> bool:
+        """Calls would be refused right now"""
+        return self.state != "closed" and time.monotonic() < self.retry_at
+
+    def allow(self) -> bool:
+        """Whether a call may go out; moves an expired open breaker to half-open"""
+        if self.state == "closed":
+            return True
+        now = time.monotonic()
+        if now < self.retry_at:
+            return False
+        # One trial call; if it never reports back another is allowed after the same delay
+        self.state = "half_open"
+        self.retry_at = now + self._delay()
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self.last_error = None
+
+    def record_failure(self, error: Optional[str] = None) -> bool:
+        """Count a failed call; returns True if this opened the breaker"""
+        self.failures += 1
+        self.last_error = error
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.opened += 1
+            self.state = "open"
+            self.retry_at = time.monotonic() + self._delay()
+            return True
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in": round(max(self.retry_at - time.monotonic(), 0.0), 3) if self.state != "closed" else 0.0,
+            "last_error": self.last_error
+        }
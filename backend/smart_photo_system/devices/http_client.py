@@ -0,0 +1,161 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .breaker import CircuitBreaker, DeviceUnavailableError
+
+
+class DeviceHTTPClient:
+    """Shared async HTTP client for talking to camera devices.
+
+    One ``httpx.AsyncClient`` keeps connections alive across control, capture
+    and download calls. ``max_connections`` bounds the whole pool and
+    ``max_per_host`` bounds concurrent requests to any single device, so one
+    slow camera cannot take every connection. The client is created lazily on
+    first use and must be closed with ``aclose``.
+
+    Each device origin (scheme and host) has a circuit breaker: after repeated
+    connection failures or timeouts, calls raise DeviceUnavailableError at once
+    instead of waiting out the timeout, and a background task re-probes the
+    device with exponential backoff until it answers again.
+    """
+
+    def __init__(self, connect_timeout: float = 3.0, control_timeout: float = 10.0,
+                 capture_timeout: float = 30.0, download_timeout: float = 30.0,
+                 max_connections: int = 32, max_keepalive: int = 16, max_per_host: int = 4,
+                 keepalive_expiry: float = 30.0, breaker_threshold: int = 3,
+                 breaker_base_delay: float = 1.0, breaker_max_delay: float = 60.0):
+        self.connect_timeout = connect_timeout
+        self.control_timeout = control_timeout
+        self.capture_timeout = capture_timeout
+        self.download_timeout = download_timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.max_per_host = max_per_host
+        self.keepalive_expiry = keepalive_expiry
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self.breaker_threshold = breaker_threshold
+        self.breaker_base_delay = breaker_base_delay
+        self.breaker_max_delay = breaker_max_delay
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._probes: Dict[str, asyncio.Task] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.control_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.keepalive_expiry
+                )
+            )
+        return self._client
+
+    def timeout(self, read: float) -> httpx.Timeout:
+        """Timeout with the shared connect limit and the given read/write/pool limit"""
+        return httpx.Timeout(read, connect=self.connect_timeout)
+
+    @asynccontextmanager
+    async def _host_slot(self, url: str) -> AsyncIterator[None]:
+        host = urlsplit(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        async with limit:
+            yield
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Circuit breaker for the device serving ``url``"""
+        origin = self._origin(url)
+        breaker = self._breakers.get(origin)
+        if breaker is None:
+            breaker = self._breakers[origin] = CircuitBreaker(
+                self.breaker_threshold, self.breaker_base_delay, self.breaker_max_delay
+            )
+        return breaker
+
+    def is_available(self, url: str) -> bool:
+        """False while the device serving ``url`` is known to be down"""
+        breaker = self._breakers.get(self._origin(url))
+        return breaker is None or not breaker.is_open
+
+    @asynccontextmanager
+    async def _guarded(self, url: str) -> AsyncIterator[None]:
+        """Refuse calls to an open breaker and feed transport errors into it"""
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            raise DeviceUnavailableError(
+                f"{self._origin(url)} is unavailable ({breaker.last_error}); "
+                f"next attempt in {breaker.stats()['retry_in']}s"
+            )
+        try:
+            yield
+        except httpx.TransportError as e:
+            if breaker.record_failure(f"{type(e).__name__}: {e}"):
+                self._schedule_probe(self._origin(url), breaker)
+            raise
+        breaker.record_success()
+
+    def _schedule_probe(self, origin: str, breaker: CircuitBreaker):
+        probe = self._probes.get(origin)
+        if probe is None or probe.done():
+            self._probes[origin] = asyncio.create_task(self._probe(origin, breaker))
+
+    async def _probe(self, origin: str, breaker: CircuitBreaker):
+        """Re-probe an open device in the background until it answers"""
+        while breaker.state != "closed":
+            await asyncio.sleep(max(breaker.retry_at - time.monotonic(), 0.0))
+            if not breaker.allow():
+                continue
+            try:
+                # Any HTTP response, even an error status, shows the device is reachable
+                await self.client.request("HEAD", origin, timeout=self.timeout(self.connect_timeout))
+            except httpx.TransportError as e:
+                breaker.record_failure(f"{type(e).__name__}: {e}")
+            else:
+                breaker.record_success()
+
+    async def post_json(self, url: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> httpx.Response:
+        """POST a JSON payload to a device"""
+        async with self._guarded(url), self._host_slot(url):
+            return await self.client.post(url, json=payload, timeout=self.timeout(timeout or self.control_timeout))
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, timeout: Optional[float] = None,
+                     **kwargs) -> AsyncIterator[httpx.Response]:
+        """Stream a response body (e.g. a photo download) without buffering it"""
+        async with self._guarded(url), self._host_slot(url):
+            async with self.client.stream(
+                method, url, timeout=self.timeout(timeout or self.download_timeout), **kwargs
+            ) as response:
+                yield response
+
+    def stats(self) -> dict:
+        return {
+            "open": self._client is not None and not self._client.is_closed,
+            "max_connections": self.max_connections,
+            "max_per_host": self.max_per_host,
+            "hosts": len(self._host_limits),
+            "breakers": {origin: breaker.stats() for origin, breaker in self._breakers.items()}
+        }
+
+    async def aclose(self):
+        for probe in self._probes.values():
+            probe.cancel()
+        await asyncio.gather(*self._probes.values(), return_exceptions=True)
+        self._probes.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
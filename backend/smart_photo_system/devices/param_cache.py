@@ -0,0 +1,72 @@
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+
+def device_key(url: str) -> str:
+    """Devices are identified by the host serving their endpoints"""
+    return urlsplit(url).netloc or url
+
+
+class AppliedParamsCache:
+    """Last camera parameters each device confirmed, so only changes are pushed.
+
+    A device may report a ``device_session`` token (e.g. an app launch id) with
+    its responses; when the token changes the device has reconnected or
+    restarted and its remembered parameters are dropped. Failed device calls
+    drop them as well, since the device state is then unknown.
+
+    The cache is per process. When other workers can drive the same devices
+    it is created disabled: nothing is remembered and every call carries the
+    full parameter set.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._applied: Dict[str, Dict[str, Any]] = {}
+        self._sessions: Dict[str, Any] = {}
+        self.skipped = 0
+        self.invalidations = 0
+
+    def delta(self, device: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Fields of ``params`` that differ from what the device last applied"""
+        applied = self._applied.get(device)
+        if applied is None:
+            return dict(params)
+        return {name: value for name, value in params.items() if applied.get(name) != value}
+
+    def is_known(self, device: str) -> bool:
+        return device in self._applied
+
+    def mark_applied(self, device: str, params: Dict[str, Any]):
+        """Record fields the device confirmed"""
+        if not self.enabled:
+            return
+        self._applied.setdefault(device, {}).update(params)
+
+    def observe_session(self, device: str, session: Any) -> bool:
+        """Note the device's session token; returns False (and forgets its state) if it changed"""
+        if session is None:
+            return True
+        previous = self._sessions.get(device)
+        self._sessions[device] = session
+        if previous is not None and previous != session:
+            self.invalidate(device)
+            return False
+        return True
+
+    def invalidate(self, device: Optional[str] = None):
+        """Forget applied parameters for one device, or for all of them"""
+        if device is None:
+            if self._applied:
+                self.invalidations += 1
+            self._applied.clear()
+        elif self._applied.pop(device, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "devices": len(self._applied),
+            "skipped": self.skipped,
+            "invalidations": self.invalidations
+        }
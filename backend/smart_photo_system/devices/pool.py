@@ -0,0 +1,152 @@
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from .param_cache import device_key
+
+
+class CameraDevice:
+    """One phone in the pool with its endpoints and live load/health state"""
+
+    def __init__(self, name: str, control_endpoint: Optional[str], capture_endpoint: Optional[str],
+                 combined_capture: Optional[bool] = None):
+        self.name = name
+        self.control_endpoint = control_endpoint
+        self.capture_endpoint = capture_endpoint
+        # Whether the device accepts configure_and_capture; None until negotiated
+        self.combined_capture = combined_capture
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.down_since: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """Key its applied parameters are tracked under, whichever endpoint is called"""
+        return device_key(self.control_endpoint or self.capture_endpoint)
+
+    @property
+    def healthy(self) -> bool:
+        return self.down_since is None
+
+    def stats(self) -> dict:
+        return {
+            "control_endpoint": self.control_endpoint,
+            "capture_endpoint": self.capture_endpoint,
+            "healthy": self.healthy,
+            "combined_capture": self.combined_capture,
+            "in_flight": self.in_flight,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error
+        }
+
+
+class DevicePool:
+    """Registry of camera devices with health state, in-flight counts and routing.
+
+    ``select`` keeps a session on the device it used before (so refinements
+    apply to the same phone) while that device is healthy, and otherwise
+    picks the least-loaded healthy device, rotating between equally loaded
+    ones. A device is marked down after ``max_failures`` consecutive failed
+    calls and becomes eligible again ``retry_after`` seconds later.
+    ``is_reachable`` (e.g. the HTTP client's circuit breaker check) takes
+    devices with an unreachable endpoint out of rotation as well.
+    """
+
+    def __init__(self, devices: List[CameraDevice], max_failures: int = 3, retry_after: float = 30.0,
+                 is_reachable: Optional[Callable[[str], bool]] = None):
+        if not devices:
+            raise ValueError("A device pool needs at least one device")
+        self.devices: Dict[str, CameraDevice] = {device.name: device for device in devices}
+        if len(self.devices) != len(devices):
+            raise ValueError("Device names must be unique")
+        self.default = devices[0]
+        self.max_failures = max_failures
+        self.retry_after = retry_after
+        self.is_reachable = is_reachable
+        self._turn = 0
+
+    @classmethod
+    def from_config(cls, specs: Optional[List[Dict[str, Any]]], control_endpoint: Optional[str],
+                    capture_endpoint: Optional[str], **kwargs) -> "DevicePool":
+        """Build from ``[{"name", "control_endpoint", "capture_endpoint", "combined_capture"}, ...]``.
+
+        Without specs the pool holds a single ``default`` device at the given endpoints.
+        """
+        if not specs:
+            return cls([CameraDevice("default", control_endpoint, capture_endpoint)], **kwargs)
+        devices = [
+            CameraDevice(
+                spec.get("name") or f"device-{index}",
+                spec.get("control_endpoint") or control_endpoint,
+                spec.get("capture_endpoint") or capture_endpoint,
+                spec.get("combined_capture")
+            )
+            for index, spec in enumerate(specs, 1)
+        ]
+        return cls(devices, **kwargs)
+
+    def get(self, name: Optional[str]) -> CameraDevice:
+        """Device by name; unknown or missing names resolve to the default device"""
+        return self.devices.get(name, self.default) if name else self.default
+
+    def is_available(self, device: CameraDevice) -> bool:
+        if not device.healthy and time.monotonic() - device.down_since < self.retry_after:
+            return False
+        if self.is_reachable is None:
+            return True
+        return all(
+            self.is_reachable(url) for url in (device.control_endpoint, device.capture_endpoint) if url
+        )
+
+    def select(self, preferred: Optional[str] = None,
+               load: Optional[Callable[[str], int]] = None) -> CameraDevice:
+        """Device for the next capture.
+
+        ``load`` reports work already routed to a device (e.g. queued jobs);
+        it defaults to the device's in-flight calls. When every device is down
+        the least-loaded one is still returned so callers can use fallbacks.
+        """
+        devices = list(self.devices.values())
+        candidates = [device for device in devices if self.is_available(device)] or devices
+        if preferred in self.devices and self.devices[preferred] in candidates:
+            return self.devices[preferred]
+
+        count = len(devices)
+        start = self._turn
+        self._turn = (self._turn + 1) % count
+        position = {device.name: index for index, device in enumerate(devices)}
+        return min(
+            candidates,
+            key=lambda device: (
+                load(device.name) if load else device.in_flight,
+                device.in_flight,
+                (position[device.name] - start) % count
+            )
+        )
+
+    @asynccontextmanager
+    async def use(self, device: CameraDevice) -> AsyncIterator[CameraDevice]:
+        """Count a device call as in flight for its duration"""
+        device.in_flight += 1
+        try:
+            yield device
+        finally:
+            device.in_flight -= 1
+
+    def record_success(self, device: CameraDevice):
+        device.consecutive_failures = 0
+        device.down_since = None
+
+    def record_failure(self, device: CameraDevice, error: Optional[str] = None):
+        device.consecutive_failures += 1
+        device.last_error = error
+        if device.consecutive_failures >= self.max_failures:
+            # Restart the down period so a failed retry waits another retry_after
+            device.down_since = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "healthy": sum(1 for device in self.devices.values() if device.healthy),
+            "devices": {name: device.stats() for name, device in self.devices.items()}
+        }
@@ -1,7 +1,11 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from langgraph.graph import StateGraph, START, END
 
+from .analysis import AnalysisCache, AnalysisExecutor
+from .devices import AppliedParamsCache, DeviceHTTPClient, DevicePool
 from .models.state import PhotoSystemState
+from .sessions.events import SessionEventBus, state_event
+from .telemetry import NodeMetrics
 from .nodes import (
     UploadNode,
     ImageAnalyzerNode, 
@@ -19,17 +23,89 @@ class SmartPhotoGraph:
         
         # Initialize nodes
         self.upload_node = UploadNode(
-            upload_dir=self.config.get("upload_dir", "/tmp/smart_photo_uploads")
+            upload_dir=self.config.get("upload_dir", "/tmp/smart_photo_uploads"),
+            max_upload_bytes=self.config.get("max_upload_bytes", 50 * 1024 * 1024),
+            chunk_size=self.config.get("upload_chunk_size", 1024 * 1024)
+        )
+        self.analysis_executor = AnalysisExecutor(
+            max_workers=self.config.get("analysis_max_workers"),
+            max_queue=self.config.get("analysis_max_queue", 32)
+        )
+        self.analysis_cache = AnalysisCache(
+            max_bytes=self.config.get("analysis_cache_max_bytes", 32 * 1024 * 1024),
+            cache_dir=self.config.get("analysis_cache_dir")
+        )
+        self.analyzer_node = ImageAnalyzerNode(
+            executor=self.analysis_executor,
+            cache=self.analysis_cache,
+            max_edge=self.config.get("analysis_max_edge"),
+            composition_grids=self.config.get("composition_grids"),
+            composition_regions=self.config.get("composition_regions"),
+            saliency_cells=self.config.get("saliency_cells", 16),
+            fields=self.config.get("analysis_fields"),
+            profiles=self.config.get("analysis_profiles")
         )
-        self.analyzer_node = ImageAnalyzerNode()
         self.refinement_node = RefinementNode()
+        # One keep-alive connection pool for every device call
+        self.device_client = DeviceHTTPClient(
+            connect_timeout=self.config.get("device_connect_timeout", 3.0),
+            control_timeout=self.config.get("device_control_timeout", 10.0),
+            capture_timeout=self.config.get("device_capture_timeout", 30.0),
+            download_timeout=self.config.get("device_download_timeout", 30.0),
+            max_connections=self.config.get("device_max_connections", 32),
+            max_per_host=self.config.get("device_max_per_host", 4),
+            breaker_threshold=self.config.get("device_breaker_threshold", 3),
+            breaker_base_delay=self.config.get("device_breaker_base_delay", 1.0),
+            breaker_max_delay=self.config.get("device_breaker_max_delay", 60.0)
+        )
+        # Parameters each device last confirmed, so repeat captures skip the control call.
+        # Only with the in-memory session store: with shared sessions another worker may
+        # have changed a device's parameters since this one last set them
+        self.applied_params = AppliedParamsCache(
+            enabled=self.config.get("session_backend", "memory") == "memory"
+        )
         self.control_node = iPhoneControlNode(
-            iphone_api_endpoint=self.config.get("iphone_api_endpoint")
+            iphone_api_endpoint=self.config.get("iphone_api_endpoint"),
+            http_client=self.device_client,
+            applied_params=self.applied_params,
+            combined_capture=self.config.get("device_combined_capture", False)
         )
         self.capture_node = PhotoCaptureNode(
             capture_api_endpoint=self.config.get("capture_api_endpoint"),
-            output_dir=self.config.get("output_dir", "/tmp/smart_photo_output")
+            output_dir=self.config.get("output_dir", "/tmp/smart_photo_output"),
+            http_client=self.device_client,
+            download_retries=self.config.get("device_download_retries", 2),
+            applied_params=self.applied_params
+        )
+        # Phones captures are routed to; the single configured endpoint pair unless camera_devices is set
+        self.devices = DevicePool.from_config(
+            self.config.get("camera_devices"),
+            self.control_node.api_endpoint,
+            self.capture_node.capture_api_endpoint,
+            max_failures=self.config.get("device_max_failures", 3),
+            retry_after=self.config.get("device_retry_after", 30.0),
+            is_reachable=self.device_client.is_available
         )
+        self.control_node.devices = self.devices
+        self.capture_node.devices = self.devices
+        # Fallback when a device turns out not to support configure_and_capture
+        self.capture_node.push_params = self.control_node.push_params
+        
+        # Progress event bus, attached by the API
+        self.events: Optional[SessionEventBus] = None
+        
+        # Per-step latency, in-flight and error metrics
+        self.metrics = NodeMetrics()
+        self.step_nodes = {
+            "upload": self.upload_node,
+            "analyze": self.analyzer_node,
+            "refine": self.refinement_node,
+            "control": self.control_node,
+            "capture": self.capture_node
+        }
+        for step, node in self.step_nodes.items():
+            node.step = step
+            node.metrics = self.metrics
         
         # Create and compile graph
         self.compiled_graph = self._create_graph()
@@ -41,19 +117,19 @@ class SmartPhotoGraph:
         
         # Define node functions
         async def upload_step(state: PhotoSystemState) -> PhotoSystemState:
-            return await self.upload_node.execute(state)
+            return await self._execute_step("upload", state)
         
         async def analyze_step(state: PhotoSystemState) -> PhotoSystemState:
-            return await self.analyzer_node.execute(state)
+            return await self._execute_step("analyze", state)
         
         async def refine_step(state: PhotoSystemState) -> PhotoSystemState:
-            return await self.refinement_node.execute(state)
+            return await self._execute_step("refine", state)
         
         async def control_step(state: PhotoSystemState) -> PhotoSystemState:
-            return await self.control_node.execute(state)
+            return await self._execute_step("control", state)
         
         async def capture_step(state: PhotoSystemState) -> PhotoSystemState:
-            return await self.capture_node.execute(state)
+            return await self._execute_step("capture", state)
         
         # Add nodes to graph
         graph.add_node("upload", upload_step)
@@ -106,34 +182,64 @@ class SmartPhotoGraph:
     async def run_single_step(self, state: PhotoSystemState, step: str) -> PhotoSystemState:
         """Run single step"""
         try:
-            if step == "upload":
-                return await self.upload_node.execute(state)
-            elif step == "analyze":
-                return await self.analyzer_node.execute(state)
-            elif step == "refine":
-                return await self.refinement_node.execute(state)
-            elif step == "control":
-                return await self.control_node.execute(state)
-            elif step == "capture":
-                return await self.capture_node.execute(state)
-            else:
+            if step not in self.step_nodes:
                 raise ValueError(f"Unknown step: {step}")
+            return await self._execute_step(step, state)
         except Exception as e:
             print(f"Step {step} execution failed: {str(e)}")
             state.error_message = f"Step {step} execution failed: {str(e)}"
+            if self.events:
+                self.events.publish(state.session_id, state_event(state))
             return state
     
     async def process_refinement(self, state: PhotoSystemState, user_input: str) -> PhotoSystemState:
         """Process user's refinement input"""
         try:
             # Use refinement node to process user input
-            updated_state = await self.refinement_node.process_user_input(state, user_input)
+            async with self.metrics.track("refine") as outcome:
+                previous_error = state.error_message
+                updated_state = await self.refinement_node.process_user_input(state, user_input)
+                if updated_state.error_message and updated_state.error_message != previous_error:
+                    outcome["outcome"] = "error"
             return updated_state
         except Exception as e:
             print(f"Failed to process refinement: {str(e)}")
             state.error_message = f"Failed to process refinement: {str(e)}"
             return state
     
+    async def _execute_step(self, step: str, state: PhotoSystemState) -> PhotoSystemState:
+        """Execute a step's node, recording latency and errors"""
+        async with self.metrics.track(step) as outcome:
+            # Nodes report failures through error_message rather than raising
+            previous_error = state.error_message
+            result = await self.step_nodes[step].execute(state)
+            if result.error_message and result.error_message != previous_error:
+                outcome["outcome"] = "error"
+            return result
+    
+    def attach_events(self, events: SessionEventBus):
+        """Publish progress events of every node to the given bus"""
+        self.events = events
+        for node in self.step_nodes.values():
+            node.events = events
+    
+    async def undo_refinement(self, state: PhotoSystemState) -> PhotoSystemState:
+        """Revert the last applied refinement"""
+        return self.refinement_node.undo(state)
+    
+    async def redo_refinement(self, state: PhotoSystemState) -> PhotoSystemState:
+        """Re-apply the last undone refinement"""
+        return self.refinement_node.redo(state)
+    
+    def shutdown(self):
+        """Release worker pools and other long-lived resources"""
+        self.analysis_executor.shutdown(wait=False)
+    
+    async def aclose(self):
+        """Close device connections, then release everything else"""
+        await self.device_client.aclose()
+        self.shutdown()
+    
     def get_graph_visualization(self) -> str:
         """Get graph visualization description"""
         return """
@@ -0,0 +1,3 @@
+from .capture_queue import CaptureJob, CaptureJobQueue, CaptureQueueFullError
+
+__all__ = ['CaptureJob', 'CaptureJobQueue', 'CaptureQueueFullError']
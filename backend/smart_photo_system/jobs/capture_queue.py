@@ -0,0 +1,165 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from ..models.state import BracketSettings
+
+
+class CaptureQueueFullError(RuntimeError):
+    """Raised when a device's capture queue has no free slots"""
+
+
+class CaptureJob(BaseModel):
+    """A queued control + capture run for one session"""
+    job_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    session_id: str
+    device: str = "default"
+    bracket: Optional[BracketSettings] = None
+    status: str = "queued"  # queued, running, succeeded, failed
+    created_at: float = Field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    current_step: Optional[str] = None
+    error_message: Optional[str] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ("queued", "running")
+
+
+class CaptureJobQueue:
+    """Per-device capture queues served by a bounded pool of worker tasks.
+
+    Each device gets ``workers_per_device`` workers and at most ``max_queue``
+    waiting jobs; further submissions raise CaptureQueueFullError so callers
+    can answer 429. Finished jobs are kept for status queries, up to
+    ``max_history`` of them. ``on_update`` is awaited whenever a job starts
+    or finishes (e.g. to publish it to other workers); its errors are ignored.
+    """
+
+    def __init__(self, run_job: Callable[[CaptureJob], Awaitable[CaptureJob]],
+                 workers_per_device: int = 1, max_queue: int = 16, max_history: int = 1000,
+                 on_update: Optional[Callable[[CaptureJob], Awaitable[None]]] = None):
+        if workers_per_device < 1 or max_queue < 0:
+            raise ValueError("workers_per_device must be positive and max_queue non-negative")
+        self.run_job = run_job
+        self.workers_per_device = workers_per_device
+        self.max_queue = max_queue
+        self.max_history = max_history
+        self.on_update = on_update
+        self._queues: Dict[str, "asyncio.Queue[CaptureJob]"] = {}
+        self._workers: Dict[str, List[asyncio.Task]] = {}
+        # Running plus waiting jobs per device
+        self._pending: Dict[str, int] = {}
+        self._jobs: "OrderedDict[str, CaptureJob]" = OrderedDict()
+        # Active job per session, so repeated capture requests do not queue twice
+        self._active: Dict[str, str] = {}
+
+    @property
+    def capacity(self) -> int:
+        """Maximum running plus waiting jobs per device"""
+        return self.workers_per_device + self.max_queue
+
+    def _queue_for(self, device: str) -> "asyncio.Queue[CaptureJob]":
+        queue = self._queues.get(device)
+        if queue is None:
+            queue = self._queues[device] = asyncio.Queue()
+            self._workers[device] = [
+                asyncio.create_task(self._work(queue)) for _ in range(self.workers_per_device)
+            ]
+        return queue
+
+    def submit(self, session_id: str, device: str = "default",
+               bracket: Optional[BracketSettings] = None) -> CaptureJob:
+        """Queue a capture for a session, or return its already active job"""
+        active_id = self._active.get(session_id)
+        if active_id is not None:
+            return self._jobs[active_id]
+
+        pending = self._pending.get(device, 0)
+        if pending >= self.capacity:
+            raise CaptureQueueFullError(f"Capture queue for {device} is full ({pending} jobs pending)")
+
+        job = CaptureJob(session_id=session_id, device=device, bracket=bracket)
+        self._remember(job)
+        self._active[session_id] = job.job_id
+        self._pending[device] = pending + 1
+        self._queue_for(device).put_nowait(job)
+        return job
+
+    def pending(self, device: str) -> int:
+        """Running plus waiting jobs for a device"""
+        return self._pending.get(device, 0)
+    
+    def get(self, job_id: str) -> Optional[CaptureJob]:
+        return self._jobs.get(job_id)
+
+    def _remember(self, job: CaptureJob):
+        self._jobs[job.job_id] = job
+        # Forget the oldest finished jobs; active ones are always kept
+        excess = len(self._jobs) - self.max_history
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if not self._jobs[job_id].is_active:
+                del self._jobs[job_id]
+                excess -= 1
+
+    async def _notify(self, job: CaptureJob):
+        if self.on_update is None:
+            return
+        try:
+            await self.on_update(job)
+        except Exception as e:
+            print(f"Failed to publish capture job {job.job_id}: {str(e)}")
+
+    async def _work(self, queue: "asyncio.Queue[CaptureJob]"):
+        while True:
+            job = await queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            await self._notify(job)
+            try:
+                await self.run_job(job)
+                job.status = "failed" if job.error_message else "succeeded"
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error_message = "Capture cancelled"
+                raise
+            except Exception as e:
+                job.status = "failed"
+                job.error_message = str(e)
+            finally:
+                job.finished_at = time.time()
+                self._active.pop(job.session_id, None)
+                self._pending[job.device] -= 1
+                queue.task_done()
+                await self._notify(job)
+
+    def stats(self) -> dict:
+        return {
+            "workers_per_device": self.workers_per_device,
+            "max_queue": self.max_queue,
+            "pending": dict(self._pending)
+        }
+
+    async def shutdown(self):
+        """Cancel workers; queued jobs are marked failed"""
+        for workers in self._workers.values():
+            for task in workers:
+                task.cancel()
+        for workers in self._workers.values():
+            await asyncio.gather(*workers, return_exceptions=True)
+        for job in self._jobs.values():
+            if job.status == "queued":
+                job.status = "failed"
+                job.error_message = "Capture cancelled"
+                await self._notify(job)
+        self._queues.clear()
+        self._workers.clear()
+        self._active.clear()
+        self._pending.clear()
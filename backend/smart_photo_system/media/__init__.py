@@ -0,0 +1,4 @@
+from .derivatives import DerivativeCache, UndecodableImageError
+from .responses import conditional_file_response, parse_range
+
+__all__ = ['DerivativeCache', 'UndecodableImageError', 'conditional_file_response', 'parse_range']
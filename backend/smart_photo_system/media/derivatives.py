@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import cv2
+from PIL import Image, UnidentifiedImageError
+
+from ..analysis.context import ImageContext
+
+# EXIF orientations that rotate the stored image by 90 degrees
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+EXIF_ORIENTATION = 0x0112
+
+
+class UndecodableImageError(ValueError):
+    """Raised when a source photo cannot be decoded for resizing"""
+
+
+class DerivativeCache:
+    """On-disk cache of resized photo derivatives with LRU eviction.
+
+    Derivatives are keyed by source path, size, modification time and target
+    width, so a re-captured photo never serves a stale thumbnail. Sources
+    are decoded at reduced scale (JPEG DCT scaling) before the final resize.
+    The cache directory is bounded by ``max_bytes``; least recently served
+    files are deleted first.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024, quality: int = 85):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Adopt derivatives left by a previous run, oldest access first"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+            elif os.path.isfile(path):
+                stat = os.stat(path)
+                files.append((stat.st_atime, path, stat.st_size))
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self._size += size
+        self._evict()
+
+    def _path(self, source: str, width: int) -> str:
+        stat = os.stat(source)
+        key = f"{os.path.abspath(source)}:{stat.st_size}:{stat.st_mtime_ns}:{width}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".jpg")
+
+    def _evict(self):
+        # The newest entry is kept even if it alone exceeds the budget; it is about to be served
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            path, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _render(self, source: str, width: int, target: str) -> Optional[int]:
+        """Decode at reduced scale, resize to width and write atomically; None if no downscale is needed"""
+        try:
+            with Image.open(source) as img:
+                source_width, source_height = img.size
+                orientation = img.getexif().get(EXIF_ORIENTATION)
+        except (UnidentifiedImageError, OSError) as e:
+            raise UndecodableImageError(f"Cannot decode photo: {str(e)}")
+        # The decoder applies EXIF orientation, so widths refer to the upright image
+        if orientation in TRANSPOSED_ORIENTATIONS:
+            source_width, source_height = source_height, source_width
+        if width >= source_width:
+            return None
+        max_edge = max(1, round(width * max(source_width, source_height) / source_width))
+        try:
+            bgr = ImageContext.from_file(source, max_edge=max_edge).bgr
+        except ValueError as e:
+            raise UndecodableImageError(str(e))
+
+        ok, encoded = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError("Cannot encode derivative")
+        temp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(encoded.tobytes())
+        os.replace(temp_path, target)
+        return len(encoded)
+
+    async def get(self, source: str, width: int) -> str:
+        """Path of the derivative of ``source`` at ``width`` pixels, rendering it if needed.
+
+        Widths at or above the source width return the source itself; sources
+        that cannot be decoded raise UndecodableImageError.
+        """
+        target = self._path(source, width)
+        if target in self._entries and os.path.exists(target):
+            self._entries.move_to_end(target)
+            self.hits += 1
+            return target
+
+        # One render per derivative even when many requests arrive together
+        lock = self._locks.setdefault(target, asyncio.Lock())
+        try:
+            async with lock:
+                if target in self._entries and os.path.exists(target):
+                    self.hits += 1
+                    return target
+                self.misses += 1
+                size = await asyncio.to_thread(self._render, source, width, target)
+                if size is None:
+                    return source
+                self._size -= self._entries.pop(target, 0)
+                self._entries[target] = size
+                self._size += size
+                self._evict()
+                return target
+        finally:
+            if not lock.locked():
+                self._locks.pop(target, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -1,3 +1,3 @@
-from .state import PhotoSystemState, CameraParams, ImageAnalysis, RefinementAction
+from .state import PhotoSystemState, CameraParams, ImageAnalysis, RefinementAction, BracketSettings, BracketFrame
 
-__all__ = ['PhotoSystemState', 'CameraParams', 'ImageAnalysis', 'RefinementAction']
+__all__ = ['PhotoSystemState', 'CameraParams', 'ImageAnalysis', 'RefinementAction', 'BracketSettings', 'BracketFrame']
@@ -9,6 +9,9 @@ class RefinementAction(BaseModel):
     user_input: str = Field(description="User's natural language input")
     delta: Dict[str, Any] = Field(description="Parameter changes")
     timestamp: str = Field(description="Timestamp")
+    # Values of the changed fields before and after the refinement, so undo and redo are one step
+    previous: Dict[str, Any] = Field(default_factory=dict, description="Changed fields before the refinement")
+    applied: Dict[str, Any] = Field(default_factory=dict, description="Changed fields after the refinement")
 
 
 class CameraParams(BaseModel):
@@ -19,6 +22,20 @@ class CameraParams(BaseModel):
     focus: Optional[str] = None  # e.g., "auto", "macro", "infinity"
     white_balance: Optional[str] = None  # e.g., "auto", "daylight", "cloudy"
     scene_mode: Optional[str] = None  # e.g., "portrait", "landscape", "night"
+
+
+class BracketSettings(BaseModel):
+    """Exposure bracketing for a burst capture"""
+    frames: int = Field(3, description="Number of frames, centred on the final parameters")
+    step: float = Field(1.0, description="Stops between neighbouring frames")
+    param: str = Field("exposure", description="Parameter the ladder varies: exposure or iso")
+
+
+class BracketFrame(BaseModel):
+    """One frame of a bracketed capture"""
+    path: str = Field(description="Local photo path")
+    exposure: Optional[float] = None
+    iso: Optional[int] = None
     
     
 class ImageAnalysis(BaseModel):
@@ -36,23 +53,38 @@ class PhotoSystemState(BaseModel):
     """Complete system state"""
     # Original reference photo
     photo_ref: Optional[str] = Field(None, description="Original reference photo path")
+    photo_hash: Optional[str] = Field(None, description="SHA-256 of the reference photo bytes")
     
     # Image analysis results
     analysis: Optional[ImageAnalysis] = Field(None, description="Image analysis results")
+    analysis_fields: Optional[List[str]] = Field(None, description="Requested analysis fields (None = all)")
     
     # User refinement history
-    refinements: List[RefinementAction] = Field(default_factory=list, description="User refinement history")
+    refinements: List[RefinementAction] = Field(default_factory=list, description="User refinement history (append-only log)")
+    refinement_position: int = Field(0, description="Number of refinements currently applied (later entries are undone)")
     
     # Final parameters
     final_params: Optional[CameraParams] = Field(None, description="Final camera parameters")
     
+    # Converted parameter changes the control node left for a combined configure_and_capture call
+    pending_params: Optional[Dict[str, Any]] = Field(None, description="Parameter changes to send with the capture")
+    
     # Capture results
     captured_photo: Optional[str] = Field(None, description="Final photo path/URL")
+    bracket: Optional[BracketSettings] = Field(None, description="Bracketing for the next capture (None = single shot)")
+    bracket_frames: List[BracketFrame] = Field(
+        default_factory=list,
+        description="Frames of the last bracketed capture, darkest first; captured_photo is the middle one"
+    )
+    device_id: Optional[str] = Field(None, description="Pool device the session captures on (affinity)")
     
     # System state
     current_step: str = Field("upload", description="Current processing step")
     error_message: Optional[str] = Field(None, description="Error message")
     session_id: str = Field(description="Session ID")
+    created_at: Optional[float] = Field(None, description="Session creation time (Unix seconds)")
+    last_access: Optional[float] = Field(None, description="Last time the session was read or updated (Unix seconds)")
+    revision: int = Field(0, description="Bumped by the session store on every write")
     
     # Temporary data
     temp_files: List[str] = Field(default_factory=list, description="Temporary files list")
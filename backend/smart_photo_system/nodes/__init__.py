@@ -1,5 +1,5 @@
 from .base import BaseNode
-from .upload_node import UploadNode
+from .upload_node import UploadNode, UploadTooLargeError
 from .image_analyzer_node import ImageAnalyzerNode
 from .refinement_node import RefinementNode
 from .iphone_control_node import iPhoneControlNode
@@ -8,6 +8,7 @@ from .photo_capture_node import PhotoCaptureNode
 __all__ = [
     'BaseNode',
     'UploadNode', 
+    'UploadTooLargeError',
     'ImageAnalyzerNode',
     'RefinementNode',
     'iPhoneControlNode',
@@ -1,11 +1,19 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from ..models.state import PhotoSystemState
+from ..sessions.events import SessionEventBus, state_event
+from ..telemetry import NodeMetrics
 
 
 class BaseNode(ABC):
     """Base class for LangGraph nodes"""
     
+    # Receives progress events for state changes (set by the graph)
+    events: Optional[SessionEventBus] = None
+    # Execution metrics and the graph step this node serves (set by the graph)
+    metrics: Optional[NodeMetrics] = None
+    step: Optional[str] = None
+    
     def __init__(self, name: str):
         self.name = name
     
@@ -18,9 +26,19 @@ class BaseNode(ABC):
         """Log messages"""
         print(f"[{level}] {self.name}: {message}")
         
+    def _record_path(self, path: str):
+        """Count which path (e.g. http, shortcuts, simulation) served this execution"""
+        if self.metrics:
+            self.metrics.record_path(self.step or self.name, path)
+    
     def _update_state(self, state: PhotoSystemState, **updates) -> PhotoSystemState:
         """Helper method to update state"""
+        before = (state.current_step, state.error_message, state.captured_photo)
         for key, value in updates.items():
             if hasattr(state, key):
                 setattr(state, key, value)
+        
+        # Push step transitions, errors and new photos to listeners
+        if self.events and (state.current_step, state.error_message, state.captured_photo) != before:
+            self.events.publish(state.session_id, state_event(state))
         return state
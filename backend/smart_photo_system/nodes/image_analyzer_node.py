@@ -1,16 +1,52 @@
-import cv2
+import hashlib
+import json
 import numpy as np
-from PIL import Image, ImageStat
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from .base import BaseNode
+from ..analysis import ImageContext, AnalysisExecutor, AnalysisCache
+from ..analysis.composition import parse_grid_spec
+from ..analysis.metrics import DEFAULT_PROFILES, resolve_metrics
 from ..models.state import PhotoSystemState, ImageAnalysis, CameraParams
 
 
+def _analyze_in_worker(image_path: str, options: Dict[str, Any], fields: Optional[List[str]]) -> ImageAnalysis:
+    """Process pool entry point (must be a picklable module-level function)"""
+    return ImageAnalyzerNode(**options)._compute_analysis(image_path, fields)
+
+
 class ImageAnalyzerNode(BaseNode):
     """Image analysis node"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        executor: Optional[AnalysisExecutor] = None,
+        cache: Optional[AnalysisCache] = None,
+        max_edge: Optional[int] = None,
+        composition_grids: Optional[List[str]] = None,
+        composition_regions: Optional[Dict[str, List[float]]] = None,
+        saliency_cells: int = 16,
+        fields: Optional[List[str]] = None,
+        profiles: Optional[Dict[str, List[str]]] = None
+    ):
         super().__init__("ImageAnalyzerNode")
+        # CPU-bound analysis runs here when set, otherwise inline
+        self.executor = executor
+        # Results keyed by upload hash, shared across sessions
+        self.cache = cache
+        # Proxy mode: analyze a reduced decode with this longest edge (None = full resolution)
+        self.max_edge = max_edge
+        # Extra composition outputs: grid specs ("4x4", "golden_ratio"),
+        # named [x0, y0, x1, y1] fractional rectangles and saliency map size
+        self.composition_grids = list(composition_grids) if composition_grids is not None else ["4x4", "golden_ratio"]
+        self.composition_regions = dict(composition_regions or {})
+        self.saliency_cells = saliency_cells
+        for spec in self.composition_grids:
+            parse_grid_spec(spec)  # Fail at startup on bad config
+        # Named field subsets callers can request, and the deployment default (None = all)
+        self.profiles = {**DEFAULT_PROFILES, **(profiles or {})}
+        for profile_fields in self.profiles.values():
+            resolve_metrics(profile_fields)
+        self.fields = self._canonical_fields(fields)
     
     async def execute(self, state: PhotoSystemState) -> PhotoSystemState:
         """Analyze uploaded image"""
@@ -20,11 +56,10 @@ class ImageAnalyzerNode(BaseNode):
             if not state.photo_ref or not state.photo_ref:
                 raise ValueError("No image found for analysis")
             
-            # Analyze image
-            analysis = await self._analyze_image(state.photo_ref)
-            
-            # Generate recommended camera parameters based on analysis results
-            recommended_params = self._generate_camera_params(analysis)
+            # Analyze image and generate recommended camera parameters
+            analysis, recommended_params = await self.analyze_with_params(
+                state.photo_ref, state.photo_hash, state.analysis_fields
+            )
             
             # Update state
             updated_state = self._update_state(
@@ -45,113 +80,119 @@ class ImageAnalyzerNode(BaseNode):
                 current_step="analyze"
             )
     
-    async def _analyze_image(self, image_path: str) -> ImageAnalysis:
-        """Analyze various image metrics"""
-        self._log(f"Analyzing image: {image_path}")
-        
-        # Use PIL for basic analysis
-        with Image.open(image_path) as pil_img:
-            # Calculate brightness, contrast etc.
-            stat = ImageStat.Stat(pil_img)
-            
-            # Convert to RGB if needed
-            if pil_img.mode != 'RGB':
-                pil_img = pil_img.convert('RGB')
-            
-            # Basic statistics
-            brightness = sum(stat.mean) / len(stat.mean) / 255.0
-            contrast = sum(stat.stddev) / len(stat.stddev) / 255.0
-        
-        # Use OpenCV for deeper analysis
-        cv_img = cv2.imread(image_path)
-        if cv_img is None:
-            raise ValueError("Cannot read image with OpenCV")
-        
-        # Convert color space
-        hsv_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2HSV)
-        
-        # Analyze composition
-        composition_analysis = self._analyze_composition(cv_img)
-        
-        # Color analysis
-        color_analysis = self._analyze_colors(cv_img, hsv_img)
-        
-        # Scene type detection
-        scene_type = self._detect_scene_type(cv_img)
-        
-        # Estimate exposure
-        estimated_exposure = self._estimate_exposure(cv_img)
-        
-        return ImageAnalysis(
-            exposure=estimated_exposure,
-            brightness=float(brightness),
-            contrast=float(contrast),
-            saturation=float(np.mean(hsv_img[:, :, 1]) / 255.0),
-            composition=composition_analysis,
-            color_analysis=color_analysis,
-            scene_type=scene_type
-        )
+    def resolve_fields(self, fields: Optional[List[str]] = None, profile: Optional[str] = None) -> Optional[List[str]]:
+        """Turn an explicit field list or a profile name into canonical fields (None = deployment default)"""
+        if fields and profile:
+            raise ValueError("Specify either analysis fields or a profile, not both")
+        if profile:
+            if profile not in self.profiles:
+                raise ValueError(f"Unknown analysis profile: {profile}")
+            fields = self.profiles[profile]
+        return self._canonical_fields(fields) if fields else None
     
-    def _analyze_composition(self, img: np.ndarray) -> Dict[str, Any]:
-        """Analyze composition"""
-        height, width = img.shape[:2]
-        
-        # Simple edge detection to determine subject position
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
-        
-        # Find region with highest edge density (simplified subject detection)
-        thirds_h = height // 3
-        thirds_w = width // 3
-        
-        regions = {
-            "top_left": np.sum(edges[0:thirds_h, 0:thirds_w]),
-            "top_center": np.sum(edges[0:thirds_h, thirds_w:2*thirds_w]),
-            "top_right": np.sum(edges[0:thirds_h, 2*thirds_w:width]),
-            "center_left": np.sum(edges[thirds_h:2*thirds_h, 0:thirds_w]),
-            "center": np.sum(edges[thirds_h:2*thirds_h, thirds_w:2*thirds_w]),
-            "center_right": np.sum(edges[thirds_h:2*thirds_h, 2*thirds_w:width]),
-            "bottom_left": np.sum(edges[2*thirds_h:height, 0:thirds_w]),
-            "bottom_center": np.sum(edges[2*thirds_h:height, thirds_w:2*thirds_w]),
-            "bottom_right": np.sum(edges[2*thirds_h:height, 2*thirds_w:width])
-        }
+    def _canonical_fields(self, fields: Optional[List[str]]) -> Optional[List[str]]:
+        if fields is None:
+            return None
+        return [spec.field for spec in resolve_metrics(fields)]
+    
+    async def analyze_with_params(
+        self,
+        image_path: str,
+        photo_hash: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[ImageAnalysis, CameraParams]:
+        """Analyze image and recommend parameters, reusing cached results for known uploads"""
+        fields = self._canonical_fields(fields) if fields else self.fields
+        computed = False
+        
+        async def compute() -> Dict[str, Any]:
+            nonlocal computed
+            computed = True
+            analysis = await self._analyze_image(image_path, fields)
+            return {
+                "analysis": analysis.model_dump(),
+                "params": self._generate_camera_params(analysis).model_dump()
+            }
         
-        # Find main region
-        main_region = max(regions.keys(), key=lambda k: regions[k])
+        if self.cache is None or not photo_hash:
+            result = await compute()
+        else:
+            result = await self.cache.get_or_compute(self.cache_key(photo_hash, fields), compute)
+        self._record_path("computed" if computed else "cache")
         
+        return ImageAnalysis(**result["analysis"]), CameraParams(**result["params"])
+    
+    def cache_key(self, photo_hash: str, fields: Optional[List[str]] = None) -> str:
+        """Cache key covering the content hash and every option that changes results"""
+        options = json.dumps({**self._worker_options(), "fields": fields}, sort_keys=True)
+        return f"{photo_hash}:{hashlib.sha1(options.encode('utf-8')).hexdigest()[:12]}"
+    
+    async def _analyze_image(self, image_path: str, fields: Optional[List[str]] = None) -> ImageAnalysis:
+        """Analyze various image metrics off the event loop"""
+        if self.executor is None:
+            return self._compute_analysis(image_path, fields)
+        return await self.executor.run(_analyze_in_worker, image_path, self._worker_options(), fields)
+    
+    def _worker_options(self) -> Dict[str, Any]:
+        """Constructor arguments needed to rebuild this analyzer in a worker"""
         return {
-            "main_subject_region": main_region,
-            "edge_density": regions,
-            "rule_of_thirds_compliance": main_region in ["top_left", "top_right", "bottom_left", "bottom_right"]
+            "max_edge": self.max_edge,
+            "composition_grids": self.composition_grids,
+            "composition_regions": self.composition_regions,
+            "saliency_cells": self.saliency_cells
         }
     
-    def _analyze_colors(self, img_bgr: np.ndarray, img_hsv: np.ndarray) -> Dict[str, Any]:
-        """Analyze colors"""
-        # Calculate dominant colors
-        height, width = img_hsv.shape[:2]
+    def _compute_analysis(self, image_path: str, fields: Optional[List[str]] = None) -> ImageAnalysis:
+        """Analyze requested image metrics (synchronous, CPU-bound)"""
+        self._log(f"Analyzing image: {image_path}")
         
-        # Hue distribution
-        hue_hist = cv2.calcHist([img_hsv], [0], None, [180], [0, 180])
-        dominant_hue = np.argmax(hue_hist)
+        # Only requested metrics run; intermediates they share are computed once, on demand
+        metrics = resolve_metrics(fields)
         
-        # Saturation and brightness statistics
-        saturation_mean = np.mean(img_hsv[:, :, 1])
-        value_mean = np.mean(img_hsv[:, :, 2])
+        # Decode once, all metrics share the same context
+        ctx = ImageContext.from_file(image_path, max_edge=self.max_edge)
+        
+        return ImageAnalysis(**{
+            spec.field: getattr(self, spec.method)(ctx) for spec in metrics
+        })
+    
+    def _compute_brightness(self, ctx: ImageContext) -> float:
+        """Average brightness from histogram moments"""
+        return ctx.stats.brightness
+    
+    def _compute_contrast(self, ctx: ImageContext) -> float:
+        """Average channel standard deviation from histogram moments"""
+        return ctx.stats.contrast
+    
+    def _compute_saturation(self, ctx: ImageContext) -> float:
+        """Average HSV saturation from histogram moments"""
+        return ctx.stats.saturation
+    
+    def _analyze_composition(self, ctx: ImageContext) -> Dict[str, Any]:
+        """Analyze composition"""
+        # Edge density per region stands in for subject detection;
+        # every query is answered from the edge map's summed-area table
+        return ctx.composition.analyze(
+            grids=self.composition_grids,
+            regions=self.composition_regions,
+            saliency_cells=self.saliency_cells
+        )
+    
+    def _analyze_colors(self, ctx: ImageContext) -> Dict[str, Any]:
+        """Analyze colors"""
+        stats = ctx.stats
         
         return {
-            "dominant_hue": int(dominant_hue),
-            "average_saturation": float(saturation_mean / 255.0),
-            "average_value": float(value_mean / 255.0),
-            "color_temperature": self._estimate_color_temperature(img_bgr)
+            "dominant_hue": stats.dominant_hue,
+            "average_saturation": stats.saturation,
+            "average_value": stats.average_value,
+            "color_temperature": self._estimate_color_temperature(ctx)
         }
     
-    def _estimate_color_temperature(self, img_bgr: np.ndarray) -> str:
+    def _estimate_color_temperature(self, ctx: ImageContext) -> str:
         """Estimate color temperature"""
         # Simple color temperature estimation (based on blue and red channel ratio)
-        b_mean = np.mean(img_bgr[:, :, 0])
-        r_mean = np.mean(img_bgr[:, :, 2])
-        
-        ratio = b_mean / (r_mean + 1e-6)  # Avoid division by zero
+        ratio = ctx.stats.blue_red_ratio
         
         if ratio > 1.2:
             return "cool"  # Cool tone
@@ -160,17 +201,14 @@ class ImageAnalyzerNode(BaseNode):
         else:
             return "neutral"  # Neutral
     
-    def _detect_scene_type(self, img: np.ndarray) -> str:
+    def _detect_scene_type(self, ctx: ImageContext) -> str:
         """Detect scene type (simplified version)"""
         # This is a simplified scene detection, actual projects might need ML models
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
         # Calculate overall image brightness
-        brightness = np.mean(gray) / 255.0
+        brightness = ctx.stats.luma_mean / 255.0
         
         # Calculate edge count (complexity)
-        edges = cv2.Canny(gray, 50, 150)
-        edge_density = np.sum(edges > 0) / (img.shape[0] * img.shape[1])
+        edge_density = ctx.edge_pixel_count / ctx.pixel_count
         
         # Simple scene classification logic
         if brightness < 0.3:
@@ -182,21 +220,13 @@ class ImageAnalyzerNode(BaseNode):
         else:
             return "landscape"
     
-    def _estimate_exposure(self, img: np.ndarray) -> float:
+    def _estimate_exposure(self, ctx: ImageContext) -> float:
         """Estimate exposure value (simplified version)"""
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Calculate image brightness distribution
-        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-        
-        # Calculate weighted average brightness
-        total_pixels = img.shape[0] * img.shape[1]
-        weighted_brightness = sum(i * hist[i][0] for i in range(256)) / total_pixels
+        # Average brightness from histogram moments
+        normalized_brightness = ctx.stats.luma_mean / 255.0
         
         # Map brightness to exposure value range (-3 to +3)
         # This is a simplified mapping, actual cases would be more complex
-        normalized_brightness = weighted_brightness / 255.0
         exposure_value = (normalized_brightness - 0.5) * 6  # Map to -3 to +3
         
         return float(np.clip(exposure_value, -3.0, 3.0))
@@ -224,7 +254,9 @@ class ImageAnalyzerNode(BaseNode):
             params.scene_mode = "auto"
         
         # Adjust exposure compensation based on brightness
-        if analysis.brightness < 0.3:
+        if analysis.brightness is None:
+            params.exposure = 0.0
+        elif analysis.brightness < 0.3:
             params.exposure = 1.0  # Increase exposure
         elif analysis.brightness > 0.7:
             params.exposure = -1.0  # Decrease exposure
@@ -1,18 +1,28 @@
 import json
 from typing import Dict, Any, Optional
-import requests
 import asyncio
 from .base import BaseNode
+from ..devices import AppliedParamsCache, CameraDevice, DeviceHTTPClient, DevicePool, device_key
 from ..models.state import PhotoSystemState, CameraParams
 
 
 class iPhoneControlNode(BaseNode):
     """iPhone camera control node"""
     
-    def __init__(self, iphone_api_endpoint: str = None):
+    def __init__(self, iphone_api_endpoint: str = None, http_client: Optional[DeviceHTTPClient] = None,
+                 applied_params: Optional[AppliedParamsCache] = None, devices: Optional[DevicePool] = None,
+                 combined_capture: bool = False):
         super().__init__("iPhoneControlNode")
         # iPhone control API endpoint (can be Shortcuts API or other iPhone control methods)
         self.api_endpoint = iphone_api_endpoint or "http://localhost:8080/iphone-control"
+        # Pooled keep-alive client shared with the capture node
+        self.http = http_client or DeviceHTTPClient()
+        # Parameters each device last confirmed, shared with the capture node
+        self.applied = applied_params or AppliedParamsCache()
+        # Phones sessions are routed to; a single default device at api_endpoint when not given
+        self.devices = devices or DevicePool.from_config(None, self.api_endpoint, None)
+        # Leave parameter changes to the capture node's configure_and_capture call where the device supports it
+        self.combined_capture = combined_capture
         
         # iPhone camera parameter mapping
         self.param_mapping = {
@@ -35,8 +45,25 @@ class iPhoneControlNode(BaseNode):
             # Convert parameters to iPhone API format
             iphone_params = self._convert_params_to_iphone_api(state.final_params)
             
+            # Only push what changed since the device last confirmed its parameters
+            camera = self.devices.get(state.device_id)
+            device = camera.key
+            changes = self.applied.delta(device, iphone_params)
+            if not changes and self.applied.is_known(device):
+                self.applied.skipped += 1
+                self._log("Camera parameters unchanged since last capture, skipping control call")
+                self._record_path("cached")
+                return self._update_state(state, current_step="capture")
+            
+            if self.combined_capture and camera.combined_capture is not False:
+                # One round trip: the capture request carries the changes
+                self._log(f"Deferring parameter changes to the capture call: {changes}")
+                self._record_path("deferred")
+                return self._update_state(state, pending_params=changes, current_step="capture")
+            
             # Send parameters to iPhone
-            success = await self._send_to_iphone(iphone_params)
+            async with self.devices.use(camera):
+                success = await self._send_to_iphone(changes, iphone_params, camera)
             
             if success:
                 self._log("Successfully set iPhone camera parameters")
@@ -52,6 +79,20 @@ class iPhoneControlNode(BaseNode):
                 current_step="capture_ready"
             )
     
+    async def push_params(self, params: CameraParams, camera: Optional[CameraDevice] = None) -> bool:
+        """Send changed parameters with a separate set_camera_params call; True once the camera has them.
+        
+        Used by the capture node when a deferred change cannot ride on the capture
+        request; the caller already counts the device as in flight.
+        """
+        camera = camera or self.devices.default
+        iphone_params = self._convert_params_to_iphone_api(params)
+        device = camera.key
+        changes = self.applied.delta(device, iphone_params)
+        if not changes and self.applied.is_known(device):
+            return True
+        return await self._send_to_iphone(changes, iphone_params, camera)
+    
     def _convert_params_to_iphone_api(self, params: CameraParams) -> Dict[str, Any]:
         """Convert parameters to iPhone API format"""
         iphone_params = {}
@@ -121,52 +162,72 @@ class iPhoneControlNode(BaseNode):
         }
         return scene_mapping.get(scene_mode.lower(), "photo")
     
-    async def _send_to_iphone(self, params: Dict[str, Any]) -> bool:
-        """Send parameters to iPhone"""
+    async def _send_to_iphone(self, params: Dict[str, Any], full_params: Optional[Dict[str, Any]] = None,
+                              camera: Optional[CameraDevice] = None) -> bool:
+        """Send parameters to iPhone.
+        
+        ``params`` may be a partial update; ``full_params`` is the complete set,
+        used when the device turns out not to hold the rest.
+        """
         self._log("Sending parameters to iPhone...")
+        full_params = full_params if full_params is not None else params
+        camera = camera or self.devices.default
         
         try:
             # Method 1: Via HTTP API (if iPhone runs corresponding app or shortcuts)
-            if await self._try_http_api(params):
+            if await self._try_http_api(params, full_params, camera.control_endpoint, camera.key):
+                self.devices.record_success(camera)
+                self._record_path("http")
                 return True
+            self.devices.record_failure(camera, "Control call failed")
+            
+            # Fallbacks cannot confirm device state, so they always get the full set
+            params = full_params
             
             # Method 2: Via iOS Shortcuts (requires pre-setup)
             if await self._try_shortcuts_api(params):
+                self._record_path("shortcuts")
                 return True
             
             # Method 3: Simulation mode (for development and testing)
-            return await self._simulate_iphone_control(params)
+            success = await self._simulate_iphone_control(params)
+            self._record_path("simulation" if success else "failed")
+            return success
             
         except Exception as e:
             self._log(f"Failed to send to iPhone: {str(e)}", "ERROR")
+            self._record_path("failed")
             return False
     
-    async def _try_http_api(self, params: Dict[str, Any]) -> bool:
+    async def _try_http_api(self, params: Dict[str, Any], full_params: Optional[Dict[str, Any]] = None,
+                            endpoint: Optional[str] = None, device: Optional[str] = None) -> bool:
         """Try to control iPhone via HTTP API"""
+        endpoint = endpoint or self.api_endpoint
+        device = device or device_key(endpoint)
         try:
             payload = {
                 "action": "set_camera_params",
                 "params": params
             }
             
-            # Async HTTP request (using sync requests here, recommend aiohttp for actual projects)
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: requests.post(
-                    self.api_endpoint,
-                    json=payload,
-                    timeout=10
-                )
-            )
+            response = await self.http.post_json(endpoint, payload, self.http.control_timeout)
             
             if response.status_code == 200:
                 result = response.json()
-                return result.get("success", False)
+                if result.get("success", False):
+                    reconnected = not self.applied.observe_session(device, result.get("device_session"))
+                    if reconnected and full_params is not None and params != full_params:
+                        # The device restarted since its last update, so the delta is not enough
+                        self._log("Device reconnected, resending all camera parameters", "WARNING")
+                        return await self._try_http_api(full_params, endpoint=endpoint, device=device)
+                    self.applied.mark_applied(device, params)
+                    return True
             
         except Exception as e:
             self._log(f"HTTP API call failed: {str(e)}", "DEBUG")
         
+        # Device state is unknown after a failed call
+        self.applied.invalidate(device)
         return False
     
     async def _try_shortcuts_api(self, params: Dict[str, Any]) -> bool:
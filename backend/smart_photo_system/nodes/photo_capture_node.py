@@ -1,20 +1,48 @@
 import os
+import math
 import uuid
+import hashlib
 from datetime import datetime
-from typing import Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import asyncio
-import requests
+import aiofiles
+import httpx
 from .base import BaseNode
-from ..models.state import PhotoSystemState
+from ..devices import AppliedParamsCache, CameraDevice, DeviceHTTPClient, DevicePool, device_key
+from ..models.state import BracketFrame, BracketSettings, CameraParams, PhotoSystemState
+
+
+# Answers from devices that do not know an action
+UNSUPPORTED_ACTION_STATUS = (400, 404, 405, 422, 501)
+
+# Bracketable range of each parameter in stops; the same limits the control node applies
+BRACKET_LIMITS = {
+    "exposure": (-2.0, 2.0),
+    "iso": (math.log2(25), math.log2(3200))
+}
 
 
 class PhotoCaptureNode(BaseNode):
     """Photo capture node"""
     
-    def __init__(self, capture_api_endpoint: str = None, output_dir: str = "/tmp/smart_photo_output"):
+    def __init__(self, capture_api_endpoint: str = None, output_dir: str = "/tmp/smart_photo_output",
+                 http_client: Optional[DeviceHTTPClient] = None, download_retries: int = 2,
+                 download_backoff: float = 0.5, applied_params: Optional[AppliedParamsCache] = None,
+                 devices: Optional[DevicePool] = None):
         super().__init__("PhotoCaptureNode")
         self.capture_api_endpoint = capture_api_endpoint or "http://localhost:8080/iphone-capture"
         self.output_dir = output_dir
+        # Pooled keep-alive client shared with the control node
+        self.http = http_client or DeviceHTTPClient()
+        # Applied camera parameters tracked by the control node; dropped when the device reconnects
+        self.applied = applied_params or AppliedParamsCache()
+        # Phones sessions are routed to; a single default device at capture_api_endpoint when not given
+        self.devices = devices or DevicePool.from_config(None, None, self.capture_api_endpoint)
+        # Two-call fallback for deferred parameter changes (the control node's push_params, wired by the graph)
+        self.push_params: Optional[Callable[[CameraParams, CameraDevice], Awaitable[bool]]] = None
+        # Interrupted downloads are retried (resuming when the device supports ranges)
+        self.download_retries = download_retries
+        self.download_backoff = download_backoff
         os.makedirs(output_dir, exist_ok=True)
     
     async def execute(self, state: PhotoSystemState) -> PhotoSystemState:
@@ -22,8 +50,20 @@ class PhotoCaptureNode(BaseNode):
         self._log("Starting photo capture")
         
         try:
-            # Trigger iPhone photo capture
-            photo_path = await self._capture_photo()
+            camera = self.devices.get(state.device_id)
+            # Parameter changes the control node left for this call
+            pending, state.pending_params = state.pending_params, None
+            if state.bracket and state.bracket.frames > 1:
+                # A burst request carries its own ladder, so deferred changes go out first
+                if pending is not None:
+                    async with self.devices.use(camera):
+                        if not await self._push_pending(state.final_params, camera):
+                            raise Exception("Unable to set camera parameters")
+                return await self._execute_bracket(state, camera)
+            
+            # Trigger iPhone photo capture on the session's device
+            async with self.devices.use(camera):
+                photo_path = await self._capture_photo(camera, pending, state.final_params)
             
             if photo_path:
                 self._log(f"Photo capture successful: {photo_path}")
@@ -32,6 +72,7 @@ class PhotoCaptureNode(BaseNode):
                 updated_state = self._update_state(
                     state,
                     captured_photo=photo_path,
+                    bracket_frames=[],
                     current_step="completed"
                 )
                 
@@ -47,55 +88,249 @@ class PhotoCaptureNode(BaseNode):
                 current_step="capture"
             )
     
-    async def _capture_photo(self) -> Optional[str]:
-        """Execute photo capture operation"""
+    async def _execute_bracket(self, state: PhotoSystemState, camera: CameraDevice) -> PhotoSystemState:
+        """Capture a bracketed burst and record every frame on the session"""
+        ladder = self._bracket_ladder(state.final_params or CameraParams(), state.bracket)
+        self._log(f"Capturing {len(ladder)}-frame {state.bracket.param} bracket: {ladder}")
+        
+        async with self.devices.use(camera):
+            paths = await self._capture_bracket(camera, ladder)
+        if not paths:
+            raise Exception("Bracket capture failed, no photos received")
+        
+        frames = [BracketFrame(path=path, **settings) for path, settings in zip(paths, ladder)]
+        self._log(f"Bracket capture successful: {len(frames)} frames")
+        return self._update_state(
+            state,
+            captured_photo=frames[len(frames) // 2].path,
+            bracket_frames=frames,
+            current_step="completed"
+        )
+    
+    def _bracket_ladder(self, params: CameraParams, bracket: BracketSettings) -> List[Dict[str, Any]]:
+        """Per-frame settings ``bracket.step`` stops apart, darkest first.
+        
+        The ladder is centred on params, shifted back inside the device limits
+        when it would run past one. Frames that still fall outside (the ladder
+        is wider than the range) or that round to a setting already taken are
+        dropped, so every frame differs.
+        """
+        low, high = BRACKET_LIMITS[bracket.param]
+        if bracket.param == "iso":
+            centre = math.log2(params.iso or 100)
+        else:
+            centre = params.exposure or 0.0
+        offsets = [(index - (bracket.frames - 1) / 2) * bracket.step for index in range(bracket.frames)]
+        centre = max(low - offsets[0], min(high - offsets[-1], centre))
+        
+        ladder: List[Dict[str, Any]] = []
+        for offset in offsets:
+            stops = centre + offset
+            if stops > high + 1e-9:
+                break
+            if bracket.param == "iso":
+                frame = {"iso": max(25, min(3200, round(2 ** stops)))}
+            else:
+                frame = {"exposure": round(max(low, min(high, stops)), 2)}
+            if frame not in ladder:
+                ladder.append(frame)
+        if len(ladder) < bracket.frames:
+            self._log(
+                f"Bracket of {bracket.frames} frames, {bracket.step} stops apart, has only "
+                f"{len(ladder)} distinct {bracket.param} settings within the device limits",
+                "WARNING"
+            )
+        return ladder
+    
+    async def _capture_bracket(self, camera: CameraDevice, ladder: List[Dict[str, Any]]) -> Optional[List[str]]:
+        """Capture one photo per ladder entry; paths in ladder order, or None"""
+        try:
+            # Method 1: One burst request to the device
+            paths = await self._try_http_bracket(camera.capture_endpoint, ladder, camera.key)
+            if paths:
+                self.devices.record_success(camera)
+                self._record_path("http")
+                return paths
+            self.devices.record_failure(camera, "Bracket capture call failed")
+            
+            # Method 2: Simulate every frame (for development testing)
+            paths = await asyncio.gather(*[self._simulate_capture() for _ in ladder])
+            if all(paths):
+                self._record_path("simulation")
+                return list(paths)
+            self._remove_files([path for path in paths if path])
+            self._record_path("failed")
+            return None
+            
+        except Exception as e:
+            self._log(f"Bracket capture execution failed: {str(e)}", "ERROR")
+            self._record_path("failed")
+            return None
+    
+    async def _try_http_bracket(self, endpoint: str, ladder: List[Dict[str, Any]],
+                                device: Optional[str] = None) -> Optional[List[str]]:
+        """Trigger a burst via HTTP API and download all frames concurrently"""
+        device = device or device_key(endpoint)
+        try:
+            payload = {
+                "action": "capture_bracket",
+                "timestamp": datetime.now().isoformat(),
+                "frames": ladder
+            }
+            
+            # A burst takes about as long as a single capture on the device
+            response = await self.http.post_json(endpoint, payload, self.http.capture_timeout)
+            
+            if response.status_code == 200:
+                result = response.json()
+                if not self.applied.observe_session(device, result.get("device_session")):
+                    self._log("Device reconnected since parameters were applied", "WARNING")
+                photos = result.get("photos") or []
+                if result.get("success") and len(photos) == len(ladder):
+                    # Concurrency per device is bounded by the HTTP client's per-host limit
+                    paths = await asyncio.gather(*[
+                        self._download_photo(photo["photo_url"], photo.get("sha256")) for photo in photos
+                    ])
+                    if all(paths):
+                        return list(paths)
+                    # A bracket is only useful complete
+                    self._remove_files([path for path in paths if path])
+                    return None
+                self._log(f"Device returned {len(photos)} of {len(ladder)} bracket frames", "WARNING")
+            
+        except Exception as e:
+            self._log(f"HTTP bracket capture API failed: {str(e)}", "DEBUG")
+        finally:
+            # Each frame reconfigures the device, so after any burst its parameters are unknown
+            # and the next capture has to set them again
+            self.applied.invalidate(device)
+        return None
+    
+    def _remove_files(self, paths: List[str]):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError as e:
+                self._log(f"Failed to delete file {path}: {str(e)}", "WARNING")
+    
+    async def _push_pending(self, params: Optional[CameraParams], camera: CameraDevice) -> bool:
+        """Apply deferred parameter changes with the separate control call"""
+        if self.push_params is None or params is None:
+            self._log("No way to send deferred camera parameters", "ERROR")
+            return False
+        return await self.push_params(params, camera)
+    
+    async def _capture_photo(self, camera: Optional[CameraDevice] = None, pending: Optional[Dict[str, Any]] = None,
+                             final_params: Optional[CameraParams] = None) -> Optional[str]:
+        """Execute photo capture operation.
+        
+        ``pending`` holds parameter changes still to be applied; they are sent in
+        the capture request when the device supports configure_and_capture, and
+        in a separate control call first otherwise.
+        """
         self._log("Triggering iPhone photo capture...")
+        camera = camera or self.devices.default
         
         try:
-            # Method 1: Trigger capture via HTTP API
-            photo_path = await self._try_http_capture()
+            if pending is None:
+                # Method 1: Trigger capture via HTTP API
+                photo_path = await self._try_http_capture(camera.capture_endpoint, camera.key)
+            else:
+                # Method 1: Configure and capture in one round trip
+                photo_path, outcome = await self._try_combined_capture(camera, pending)
+                if outcome == "unsupported":
+                    # Two-call flow: set parameters, then capture
+                    if not await self._push_pending(final_params, camera):
+                        raise Exception("Unable to set camera parameters")
+                    photo_path = await self._try_http_capture(camera.capture_endpoint, camera.key)
             if photo_path:
+                self.devices.record_success(camera)
+                self._record_path("http")
                 return photo_path
+            self.devices.record_failure(camera, "Capture call failed")
             
             # Method 2: Trigger capture via iOS Shortcuts
             photo_path = await self._try_shortcuts_capture()
             if photo_path:
+                self._record_path("shortcuts")
                 return photo_path
             
             # Method 3: Simulate capture (for development testing)
-            return await self._simulate_capture()
+            photo_path = await self._simulate_capture()
+            self._record_path("simulation" if photo_path else "failed")
+            return photo_path
             
         except Exception as e:
             self._log(f"Photo capture execution failed: {str(e)}", "ERROR")
+            self._record_path("failed")
             return None
     
-    async def _try_http_capture(self) -> Optional[str]:
-        """Trigger capture via HTTP API"""
+    async def _try_combined_capture(self, camera: CameraDevice,
+                                    params: Dict[str, Any]) -> Tuple[Optional[str], str]:
+        """Set parameters and capture with one configure_and_capture request.
+        
+        Returns the photo path and an outcome: "captured", "unsupported" (the
+        device rejected the action, or answered anything but success before it
+        ever accepted it; it is not offered again) or "failed".
+        """
+        device = camera.key
+        try:
+            payload = {
+                "action": "configure_and_capture",
+                "params": params,
+                "timestamp": datetime.now().isoformat()
+            }
+            
+            response = await self.http.post_json(camera.capture_endpoint, payload, self.http.capture_timeout)
+            result = response.json() if response.status_code == 200 else {}
+            
+            if result.get("success") and result.get("photo_url"):
+                camera.combined_capture = True
+                if not self.applied.observe_session(device, result.get("device_session")):
+                    self._log("Device reconnected; only the changed parameters were applied", "WARNING")
+                self.applied.mark_applied(device, params)
+                photo_path = await self._download_photo(result["photo_url"], result.get("sha256"))
+                return photo_path, "captured" if photo_path else "failed"
+            
+            # Until the device has once accepted the action, any other answer means it does not know it
+            if camera.combined_capture is None or response.status_code in UNSUPPORTED_ACTION_STATUS:
+                camera.combined_capture = False
+                self._log(f"Device {camera.name} does not support configure_and_capture, using separate calls")
+                return None, "unsupported"
+            
+        except Exception as e:
+            self._log(f"HTTP configure_and_capture failed: {str(e)}", "DEBUG")
+        
+        # Device state is unknown after a failed call
+        self.applied.invalidate(device)
+        return None, "failed"
+    
+    async def _try_http_capture(self, endpoint: Optional[str] = None, device: Optional[str] = None) -> Optional[str]:
+        """Trigger capture via HTTP API; ``device`` is the key applied parameters are tracked under"""
+        endpoint = endpoint or self.capture_api_endpoint
+        device = device or device_key(endpoint)
         try:
             payload = {
                 "action": "capture_photo",
                 "timestamp": datetime.now().isoformat()
             }
             
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: requests.post(
-                    self.capture_api_endpoint,
-                    json=payload,
-                    timeout=30  # Photo capture may take longer
-                )
-            )
+            # Photo capture may take longer than parameter control
+            response = await self.http.post_json(endpoint, payload, self.http.capture_timeout)
             
             if response.status_code == 200:
                 result = response.json()
+                if not self.applied.observe_session(device, result.get("device_session")):
+                    self._log("Device reconnected since parameters were applied", "WARNING")
                 if result.get("success") and result.get("photo_url"):
-                    # Download photo to local
-                    return await self._download_photo(result["photo_url"])
+                    # Download photo to local, verifying the device's checksum when it sends one
+                    return await self._download_photo(result["photo_url"], result.get("sha256"))
             
         except Exception as e:
             self._log(f"HTTP capture API failed: {str(e)}", "DEBUG")
         
+        # Device state is unknown after a failed call
+        self.applied.invalidate(device)
         return None
     
     async def _try_shortcuts_capture(self) -> Optional[str]:
@@ -141,37 +376,90 @@ class PhotoCaptureNode(BaseNode):
             self._log(f"Simulation capture failed: {str(e)}", "ERROR")
             return None
     
-    async def _download_photo(self, photo_url: str) -> Optional[str]:
-        """Download photo from URL to local"""
+    async def _download_photo(self, photo_url: str, expected_sha256: Optional[str] = None) -> Optional[str]:
+        """Stream photo from URL to local disk.
+        
+        Chunks go to a ``.part`` file while a SHA-256 is computed on the fly;
+        the file is renamed into place only once complete and verified.
+        Interrupted transfers are retried, resuming with a Range request when
+        the device supports it.
+        """
+        # Generate local filename
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"captured_{timestamp}_{uuid.uuid4().hex[:8]}.jpg"
+        local_path = os.path.join(self.output_dir, filename)
+        temp_path = f"{local_path}.part"
+        
+        self._log(f"Downloading photo: {photo_url}")
+        progress = {"received": 0, "digest": hashlib.sha256()}
         try:
-            self._log(f"Downloading photo: {photo_url}")
-            
-            # Generate local filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"captured_{timestamp}_{uuid.uuid4().hex[:8]}.jpg"
-            local_path = os.path.join(self.output_dir, filename)
-            
-            # Async download
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: requests.get(photo_url, timeout=30)
-            )
-            
-            if response.status_code == 200:
-                # Save photo
-                with open(local_path, 'wb') as f:
-                    f.write(response.content)
+            for attempt in range(self.download_retries + 1):
+                if attempt:
+                    await asyncio.sleep(self.download_backoff * 2 ** (attempt - 1))
+                    self._log(f"Retrying photo download from byte {progress['received']} "
+                              f"(attempt {attempt + 1})", "WARNING")
+                try:
+                    expected_size, header_sha256 = await self._download_attempt(photo_url, temp_path, progress)
+                except httpx.HTTPError as e:
+                    self._log(f"Photo download interrupted: {type(e).__name__} {str(e)}", "WARNING")
+                    continue
                 
-                self._log(f"Photo download successful: {local_path}")
-                return local_path
-            else:
-                self._log(f"Photo download failed, status code: {response.status_code}", "ERROR")
-                return None
+                received = progress["received"]
+                if expected_size is not None and received != expected_size:
+                    self._log(f"Photo download incomplete: {received} of {expected_size} bytes", "WARNING")
+                    continue
                 
+                checksum = progress["digest"].hexdigest()
+                expected = (expected_sha256 or header_sha256 or "").lower()
+                if expected and checksum != expected:
+                    # Corrupt bytes cannot be resumed past; start over
+                    self._log(f"Photo checksum mismatch: got {checksum}, expected {expected}", "WARNING")
+                    progress.update(received=0, digest=hashlib.sha256())
+                    continue
+                
+                os.replace(temp_path, local_path)
+                self._log(f"Photo download successful: {local_path} ({received} bytes, sha256 {checksum})")
+                return local_path
+            
+            self._log(f"Photo download failed after {self.download_retries + 1} attempts", "ERROR")
+            return None
         except Exception as e:
             self._log(f"Photo download failed: {str(e)}", "ERROR")
             return None
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    async def _download_attempt(self, photo_url: str, temp_path: str,
+                                progress: dict) -> Tuple[Optional[int], Optional[str]]:
+        """Fetch the photo into temp_path, resuming after ``progress["received"]`` bytes.
+        
+        ``progress`` is updated chunk by chunk, so it stays accurate when the
+        stream breaks. Returns the expected total size and the device's checksum
+        header, if any.
+        """
+        offset = progress["received"]
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        async with self.http.stream("GET", photo_url, headers=headers) as response:
+            if response.status_code == 206 and offset:
+                mode = "ab"
+                total = response.headers.get("content-range", "").rpartition("/")[2]
+            elif response.status_code == 200:
+                # First attempt, or the device ignored the range: start over
+                mode = "wb"
+                progress.update(received=0, digest=hashlib.sha256())
+                total = response.headers.get("content-length", "")
+            else:
+                raise Exception(f"Photo download status code {response.status_code}")
+            expected_size = int(total) if total.isdigit() else None
+            
+            async with aiofiles.open(temp_path, mode) as f:
+                # Chunks as they arrive off the wire, so a broken stream keeps everything received
+                async for chunk in response.aiter_bytes():
+                    await f.write(chunk)
+                    progress["digest"].update(chunk)
+                    progress["received"] += len(chunk)
+            return expected_size, response.headers.get("x-checksum-sha256")
     
     async def get_photo_info(self, photo_path: str) -> dict:
         """Get captured photo information"""
@@ -52,23 +52,32 @@ class RefinementNode(BaseNode):
                     error_message="Unable to understand your instructions, please try more specific descriptions"
                 )
             
+            # A new instruction after undo discards the undone entries
+            position = state.refinement_position
+            if position < len(state.refinements):
+                del state.refinements[position:]
+            
             # Apply adjustments to current parameters
-            new_params = self._apply_adjustments(state.final_params or CameraParams(), parsed_adjustments)
+            current_params = state.final_params or CameraParams()
+            new_params = self._apply_adjustments(current_params, parsed_adjustments)
             
-            # Create refinement record
+            # Create refinement record with the changed fields on both sides
             refinement = RefinementAction(
                 user_input=user_input,
                 delta=parsed_adjustments,
-                timestamp=datetime.now().isoformat()
+                timestamp=datetime.now().isoformat(),
+                previous={name: getattr(current_params, name) for name in parsed_adjustments},
+                applied={name: getattr(new_params, name) for name in parsed_adjustments}
             )
             
-            # Update state
-            updated_refinements = state.refinements + [refinement]
+            # Append to the log in place
+            state.refinements.append(refinement)
+            position += 1
             
             updated_state = self._update_state(
                 state,
                 final_params=new_params,
-                refinements=updated_refinements,
+                refinement_position=position,
                 current_step="capture_ready"
             )
             
@@ -82,6 +91,31 @@ class RefinementNode(BaseNode):
                 error_message=f"Failed to process instructions: {str(e)}"
             )
     
+    def undo(self, state: PhotoSystemState) -> PhotoSystemState:
+        """Revert the most recent applied refinement"""
+        if state.refinement_position == 0:
+            return self._update_state(state, error_message="Nothing to undo")
+        refinement = state.refinements[state.refinement_position - 1]
+        return self._move_to(state, state.refinement_position - 1, refinement.previous)
+    
+    def redo(self, state: PhotoSystemState) -> PhotoSystemState:
+        """Re-apply the most recently undone refinement"""
+        if state.refinement_position >= len(state.refinements):
+            return self._update_state(state, error_message="Nothing to redo")
+        refinement = state.refinements[state.refinement_position]
+        return self._move_to(state, state.refinement_position + 1, refinement.applied)
+    
+    def _move_to(self, state: PhotoSystemState, position: int, values: Dict[str, Any]) -> PhotoSystemState:
+        """Step to a neighbouring position by restoring the fields one refinement changed"""
+        self._log(f"Moving to refinement {position} of {len(state.refinements)}")
+        return self._update_state(
+            state,
+            final_params=(state.final_params or CameraParams()).model_copy(update=values),
+            refinement_position=position,
+            current_step="capture_ready",
+            error_message=None
+        )
+    
     def _parse_user_input(self, user_input: str) -> Dict[str, Any]:
         """Parse user's natural language input"""
         user_input = user_input.lower()
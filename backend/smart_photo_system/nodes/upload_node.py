@@ -1,18 +1,33 @@
 import os
 import uuid
-from typing import Optional
+import hashlib
+from typing import Any, Optional, Tuple
 import aiofiles
 from PIL import Image
 from .base import BaseNode
 from ..models.state import PhotoSystemState
 
 
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured size limit"""
+
+
 class UploadNode(BaseNode):
     """Node for handling image uploads"""
     
-    def __init__(self, upload_dir: str = "/tmp/smart_photo_uploads"):
+    def __init__(
+        self,
+        upload_dir: str = "/tmp/smart_photo_uploads",
+        max_upload_bytes: int = 50 * 1024 * 1024,
+        chunk_size: int = 1024 * 1024,
+        max_image_pixels: int = 200_000_000
+    ):
         super().__init__("UploadNode")
         self.upload_dir = upload_dir
+        # 0 disables the corresponding limit
+        self.max_upload_bytes = max_upload_bytes
+        self.chunk_size = chunk_size
+        self.max_image_pixels = max_image_pixels
         os.makedirs(upload_dir, exist_ok=True)
     
     async def execute(self, state: PhotoSystemState) -> PhotoSystemState:
@@ -41,26 +56,65 @@ class UploadNode(BaseNode):
                 current_step="upload"
             )
     
-    async def save_uploaded_file(self, file_content: bytes, filename: str) -> str:
-        """Save uploaded file"""
+    async def save_uploaded_file(self, source: Any, filename: str) -> Tuple[str, str]:
+        """Stream an uploaded file to disk, returning its path and SHA-256 content hash
+        
+        ``source`` is any object with an async ``read(size)`` method (e.g. FastAPI's
+        UploadFile), so peak memory is one chunk regardless of file size.
+        """
         # Generate unique filename
-        file_ext = os.path.splitext(filename)[1] or '.jpg'
+        file_ext = os.path.splitext(filename or "")[1] or '.jpg'
         unique_filename = f"{uuid.uuid4()}{file_ext}"
         file_path = os.path.join(self.upload_dir, unique_filename)
         
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(file_content)
+        # Save file chunk by chunk, hashing and enforcing the size cap on the fly
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(file_path, 'wb') as f:
+                while chunk := await source.read(self.chunk_size):
+                    size += len(chunk)
+                    if self.max_upload_bytes and size > self.max_upload_bytes:
+                        raise UploadTooLargeError(
+                            f"File exceeds the maximum upload size of {self.max_upload_bytes} bytes"
+                        )
+                    digest.update(chunk)
+                    await f.write(chunk)
+            
+            # Verify it's a valid image from its header alone
+            self._probe_image(file_path)
+        except Exception as e:
+            if os.path.exists(file_path):
+                os.remove(file_path)  # Delete partial or invalid file
+            if isinstance(e, ValueError):
+                raise
+            raise ValueError(f"Failed to save upload: {str(e)}")
         
-        # Verify if it's a valid image
+        self._log(f"Image saved successfully: {file_path} ({size} bytes)")
+        return file_path, digest.hexdigest()
+    
+    def _probe_image(self, file_path: str):
+        """Cheap validity check: parse the header and dimensions without decoding pixels"""
         try:
             with Image.open(file_path) as img:
-                img.verify()
-            self._log(f"Image saved successfully: {file_path}")
-            return file_path
+                width, height = img.size
+                image_format = img.format
         except Exception as e:
-            os.remove(file_path)  # Delete invalid file
             raise ValueError(f"Invalid image file: {str(e)}")
+        
+        if width <= 0 or height <= 0:
+            raise ValueError("Invalid image file: empty dimensions")
+        if self.max_image_pixels and width * height > self.max_image_pixels:
+            raise ValueError(f"Invalid image file: {width}x{height} exceeds the pixel limit")
+        self._log(f"Probed {image_format} image {width}x{height}", "DEBUG")
+    
+    async def hash_file(self, file_path: str, chunk_size: int = 1024 * 1024) -> str:
+        """SHA-256 of an existing file, read in chunks"""
+        digest = hashlib.sha256()
+        async with aiofiles.open(file_path, 'rb') as f:
+            while chunk := await f.read(chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest()
     
     def cleanup_temp_files(self, file_paths: list):
         """Clean up temporary files"""
@@ -0,0 +1,44 @@
+from typing import Any, Dict
+
+from .base import SessionStore, serialize_state, deserialize_state, filter_index_name
+from .expiry import SessionExpiryScheduler
+from .events import SessionEventBus, RedisSessionEventBus, state_event, deleted_event
+from .memory import InMemorySessionStore
+from .redis_store import RedisSessionStore
+
+
+def create_session_store(config: Dict[str, Any]) -> SessionStore:
+    """Build the session store selected by the session_backend config key"""
+    backend = config.get("session_backend", "memory")
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "redis":
+        return RedisSessionStore(
+            url=config.get("redis_url", "redis://localhost:6379/0"),
+            key_prefix=config.get("redis_key_prefix", "smart_photo:")
+        )
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+def create_event_bus(store: SessionStore) -> SessionEventBus:
+    """Event bus matching the session store, so events reach listeners on any worker"""
+    if isinstance(store, RedisSessionStore):
+        return RedisSessionEventBus(store.client, store.key_prefix)
+    return SessionEventBus()
+
+
+__all__ = [
+    'SessionStore',
+    'InMemorySessionStore',
+    'RedisSessionStore',
+    'create_session_store',
+    'SessionExpiryScheduler',
+    'SessionEventBus',
+    'RedisSessionEventBus',
+    'create_event_bus',
+    'state_event',
+    'deleted_event',
+    'serialize_state',
+    'deserialize_state',
+    'filter_index_name'
+]
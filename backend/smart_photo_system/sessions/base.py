@@ -0,0 +1,143 @@
+import base64
+import json
+import zlib
+from itertools import combinations
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from ..models.state import PhotoSystemState
+
+# Serialized states larger than this are zlib-compressed
+COMPRESS_THRESHOLD = 1024
+_COMPRESSED_MARKER = b"z"
+
+
+def serialize_state(state: PhotoSystemState) -> bytes:
+    """Compact serialized form of a session state"""
+    data = state.model_dump_json(exclude_defaults=True).encode("utf-8")
+    if len(data) > COMPRESS_THRESHOLD:
+        return _COMPRESSED_MARKER + zlib.compress(data, 1)
+    return data
+
+
+def deserialize_state(data: bytes) -> PhotoSystemState:
+    if data[:1] == _COMPRESSED_MARKER:
+        data = zlib.decompress(data[1:])
+    return PhotoSystemState.model_validate_json(data)
+
+
+def sort_key(state: PhotoSystemState) -> Tuple[float, str]:
+    """Listing order of a session: creation time, ties broken by id"""
+    return (state.created_at or 0.0, state.session_id)
+
+
+def index_names(state: PhotoSystemState) -> List[str]:
+    """Secondary indexes a session belongs to.
+
+    There is one index per combination of filter values (e.g.
+    ``step:completed|error:0``), so any set of filters is served by a single
+    index. That is seven indexes per session.
+    """
+    parts = _filter_parts(
+        current_step=state.current_step,
+        has_error=state.error_message is not None,
+        has_photo=state.captured_photo is not None
+    )
+    return ["|".join(combo) for size in range(1, len(parts) + 1) for combo in combinations(parts, size)]
+
+
+def _filter_parts(current_step: Optional[str] = None, has_error: Optional[bool] = None,
+                  has_photo: Optional[bool] = None) -> List[str]:
+    # Always in this order, so combined index names are canonical
+    parts = []
+    if current_step is not None:
+        parts.append(f"step:{current_step}")
+    if has_error is not None:
+        parts.append(f"error:{int(has_error)}")
+    if has_photo is not None:
+        parts.append(f"photo:{int(has_photo)}")
+    return parts
+
+
+def filter_index_name(current_step: Optional[str] = None, has_error: Optional[bool] = None,
+                      has_photo: Optional[bool] = None) -> Optional[str]:
+    """The index holding exactly the sessions matching the given filters (None when no filter is set)"""
+    return "|".join(_filter_parts(current_step, has_error, has_photo)) or None
+
+
+def encode_cursor(key: Tuple[float, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        created_at, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(created_at), str(session_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+class SessionStore(ABC):
+    """Storage for session states, shared by all API workers using the same backend"""
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[PhotoSystemState]:
+        """Load a session, or None if it does not exist"""
+
+    @abstractmethod
+    async def save(self, state: PhotoSystemState):
+        """Create or replace a session (keyed by state.session_id) and bump its revision"""
+
+    @abstractmethod
+    async def update(self, session_id: str,
+                     apply: Callable[[PhotoSystemState], None]) -> Optional[PhotoSystemState]:
+        """Atomically load a session, let ``apply`` modify it and save it.
+
+        No other write to the session lands between the load and the save.
+        Returns the saved state, or None if the session does not exist.
+        """
+
+    @abstractmethod
+    async def touch(self, session_id: str, last_access: float):
+        """Record a read of a session without rewriting its state"""
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> Optional[PhotoSystemState]:
+        """Remove a session and return its last state, or None if it did not exist"""
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Number of stored sessions"""
+
+    @abstractmethod
+    def iter_states(self) -> AsyncIterator[PhotoSystemState]:
+        """Iterate over all stored sessions"""
+
+    @abstractmethod
+    async def list_page(self, limit: int, cursor: Optional[str] = None,
+                        index: Optional[str] = None) -> Tuple[List[PhotoSystemState], Optional[str]]:
+        """One page of sessions in creation order from one index (None = all sessions), plus the next cursor"""
+
+    async def expired_ids(self, idle_before: Optional[float], created_before: Optional[float],
+                          limit: int = 100) -> List[str]:
+        """Up to ``limit`` ids of sessions last accessed before ``idle_before`` or created before ``created_before``.
+
+        Lets every worker sweep a shared store, whichever worker last used a
+        session. Process-local stores return nothing: their own worker's
+        expiry scheduler already tracks every session.
+        """
+        return []
+
+    async def save_job(self, job_id: str, data: str, ttl: int):
+        """Publish a capture job record so other workers can report it.
+
+        Only stores shared across workers keep these; the worker running a
+        job always answers for it from its own queue.
+        """
+
+    async def get_job(self, job_id: str) -> Optional[str]:
+        """A capture job record published by any worker, or None"""
+        return None
+
+    async def close(self):
+        """Release backend connections"""
@@ -0,0 +1,135 @@
+import asyncio
+import json
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Set, Tuple
+
+from ..models.state import PhotoSystemState
+
+
+def deleted_event(session_id: str) -> Dict[str, Any]:
+    """Final event sent when a session is deleted or expires"""
+    return {"event": "deleted", "session_id": session_id}
+
+
+def state_event(state: PhotoSystemState) -> Dict[str, Any]:
+    """Progress event describing a session's current step, error and photo"""
+    return {
+        "event": "state",
+        "session_id": state.session_id,
+        "current_step": state.current_step,
+        "error_message": state.error_message,
+        "photo_url": f"/photo/{state.session_id}" if state.captured_photo else None
+    }
+
+
+class EventSubscription:
+    """Events for one session, delivered to one listener"""
+
+    def __init__(self, max_pending: int = 64, on_close: Optional[Callable[[], None]] = None):
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(max_pending)
+        self._on_close = on_close
+
+    def push(self, event: Dict[str, Any]):
+        # Slow listeners lose the oldest events rather than blocking publishers
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Next event, or None if nothing arrived within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        if self._on_close:
+            self._on_close()
+
+
+class SessionEventBus:
+    """In-process publish/subscribe of session progress events.
+
+    ``publish`` is synchronous so nodes can call it from ``_update_state``.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[EventSubscription]] = {}
+
+    def publish(self, session_id: str, event: Dict[str, Any]):
+        for subscription in self._subscribers.get(session_id, ()):
+            subscription.push(event)
+
+    async def subscribe(self, session_id: str) -> EventSubscription:
+        subscribers = self._subscribers.setdefault(session_id, set())
+
+        def unsubscribe():
+            subscribers.discard(subscription)
+            if not subscribers and self._subscribers.get(session_id) is subscribers:
+                del self._subscribers[session_id]
+
+        subscription = EventSubscription(on_close=unsubscribe)
+        subscribers.add(subscription)
+        return subscription
+
+    async def close(self):
+        pass
+
+
+class RedisEventSubscription(EventSubscription):
+    """Subscription fed by a Redis pub/sub channel"""
+
+    def __init__(self, pubsub: Any):
+        self.pubsub = pubsub
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None or message.get("type") != "message":
+            return None
+        return json.loads(message["data"])
+
+    async def close(self):
+        await self.pubsub.unsubscribe()
+        close = getattr(self.pubsub, "aclose", None) or self.pubsub.close
+        await close()
+
+
+class RedisSessionEventBus(SessionEventBus):
+    """Event bus over Redis pub/sub, so listeners may connect to any worker"""
+
+    def __init__(self, client: Any, key_prefix: str = "smart_photo:"):
+        super().__init__()
+        self.client = client
+        self.key_prefix = key_prefix
+        # Published by a single sender task so events keep their order
+        self._outbox: Deque[Tuple[str, str]] = deque()
+        self._sender: Optional[asyncio.Task] = None
+
+    def _channel(self, session_id: str) -> str:
+        return f"{self.key_prefix}events:{session_id}"
+
+    def publish(self, session_id: str, event: Dict[str, Any]):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._outbox.append((self._channel(session_id), json.dumps(event)))
+        if self._sender is None or self._sender.done():
+            self._sender = loop.create_task(self._send())
+
+    async def _send(self):
+        while self._outbox:
+            channel, data = self._outbox.popleft()
+            try:
+                await self.client.publish(channel, data)
+            except Exception as e:
+                print(f"Failed to publish session event: {str(e)}")
+
+    async def subscribe(self, session_id: str) -> EventSubscription:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self._channel(session_id))
+        return RedisEventSubscription(pubsub)
+
+    async def close(self):
+        if self._sender is not None:
+            await self._sender
@@ -0,0 +1,79 @@
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ..models.state import PhotoSystemState
+
+
+class SessionExpiryScheduler:
+    """Min-heap of session deadlines.
+
+    A session expires ``idle_ttl`` seconds after its last access or
+    ``absolute_ttl`` seconds after creation, whichever comes first (0 disables
+    either limit). Rescheduling pushes a new heap entry and leaves the old one
+    behind; stale entries are skipped when popped, so scheduling and expiring
+    are both O(log n).
+    """
+
+    def __init__(self, idle_ttl: float = 3600, absolute_ttl: float = 86400):
+        self.idle_ttl = idle_ttl
+        self.absolute_ttl = absolute_ttl
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.idle_ttl or self.absolute_ttl)
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def deadline(self, state: PhotoSystemState) -> Optional[float]:
+        """Time at which a session expires, or None if it never does"""
+        created_at = state.created_at if state.created_at is not None else time.time()
+        last_access = state.last_access if state.last_access is not None else created_at
+        candidates = []
+        if self.idle_ttl:
+            candidates.append(last_access + self.idle_ttl)
+        if self.absolute_ttl:
+            candidates.append(created_at + self.absolute_ttl)
+        return min(candidates) if candidates else None
+
+    def is_expired(self, state: PhotoSystemState, now: Optional[float] = None) -> bool:
+        deadline = self.deadline(state)
+        return deadline is not None and deadline <= (now if now is not None else time.time())
+
+    def schedule(self, state: PhotoSystemState):
+        """Track a session, replacing any earlier deadline"""
+        deadline = self.deadline(state)
+        if deadline is None:
+            return
+        if self._deadlines.get(state.session_id) == deadline:
+            return
+        self._deadlines[state.session_id] = deadline
+        heapq.heappush(self._heap, (deadline, state.session_id))
+        # Rebuild once stale entries dominate so the heap stays O(live sessions)
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(d, sid) for sid, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def discard(self, session_id: str):
+        """Stop tracking a session (its heap entry is dropped lazily)"""
+        self._deadlines.pop(session_id, None)
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest live deadline"""
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_expired(self, now: Optional[float] = None) -> List[str]:
+        """Remove and return the ids of all sessions whose deadline has passed"""
+        now = now if now is not None else time.time()
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, session_id = heapq.heappop(self._heap)
+            if self._deadlines.get(session_id) == deadline:
+                del self._deadlines[session_id]
+                expired.append(session_id)
+        return expired
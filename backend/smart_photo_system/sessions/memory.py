@@ -0,0 +1,89 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .base import SessionStore, sort_key, index_names, encode_cursor, decode_cursor
+from ..models.state import PhotoSystemState
+
+ALL_INDEX = "all"
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local session store (single worker only)
+
+    Each secondary index is a list of sort keys kept in order, so a page is
+    a bisect to the cursor followed by a slice of one page of keys.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, PhotoSystemState] = {}
+        # session id -> (sort key, index names) it is currently filed under
+        self._entries: Dict[str, Tuple[Tuple[float, str], List[str]]] = {}
+        self._indexes: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+
+    def _unindex(self, session_id: str):
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return
+        key, names = entry
+        for name in names:
+            index = self._indexes[name]
+            position = bisect_left(index, key)
+            if position < len(index) and index[position] == key:
+                del index[position]
+            if not index:
+                del self._indexes[name]
+
+    def _reindex(self, state: PhotoSystemState):
+        key, names = sort_key(state), [ALL_INDEX] + index_names(state)
+        if self._entries.get(state.session_id) == (key, names):
+            return
+        self._unindex(state.session_id)
+        for name in names:
+            insort(self._indexes[name], key)
+        self._entries[state.session_id] = (key, names)
+
+    async def get(self, session_id: str) -> Optional[PhotoSystemState]:
+        return self._sessions.get(session_id)
+
+    async def save(self, state: PhotoSystemState):
+        state.revision += 1
+        self._sessions[state.session_id] = state
+        self._reindex(state)
+
+    async def update(self, session_id: str,
+                     apply: Callable[[PhotoSystemState], None]) -> Optional[PhotoSystemState]:
+        # Nothing awaits between load and save, so no other task can interleave
+        state = self._sessions.get(session_id)
+        if state is None:
+            return None
+        apply(state)
+        state.revision += 1
+        self._reindex(state)
+        return state
+
+    async def touch(self, session_id: str, last_access: float):
+        state = self._sessions.get(session_id)
+        if state is not None:
+            state.last_access = max(state.last_access or 0.0, last_access)
+
+    async def delete(self, session_id: str) -> Optional[PhotoSystemState]:
+        self._unindex(session_id)
+        return self._sessions.pop(session_id, None)
+
+    async def count(self) -> int:
+        return len(self._sessions)
+
+    async def iter_states(self) -> AsyncIterator[PhotoSystemState]:
+        # Snapshot so callers may delete while iterating
+        for state in list(self._sessions.values()):
+            yield state
+
+    async def list_page(self, limit: int, cursor: Optional[str] = None,
+                        index: Optional[str] = None) -> Tuple[List[PhotoSystemState], Optional[str]]:
+        keys = self._indexes.get(index or ALL_INDEX, [])
+        start = bisect_right(keys, decode_cursor(cursor)) if cursor else 0
+        page_keys = keys[start:start + limit]
+        page = [self._sessions[session_id] for _, session_id in page_keys]
+        next_cursor = encode_cursor(page_keys[-1]) if page_keys and start + limit < len(keys) else None
+        return page, next_cursor
@@ -0,0 +1,217 @@
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:
+    class WatchError(Exception):
+        """Stand-in so the module imports without redis; the backend itself requires it"""
+
+from .base import (
+    SessionStore, serialize_state, deserialize_state, sort_key, index_names, encode_cursor, decode_cursor
+)
+from ..models.state import PhotoSystemState
+
+
+def _text(value: Any) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class RedisSessionStore(SessionStore):
+    """Session store speaking the Redis protocol, shared across workers and hosts
+
+    States are stored as compact serialized blobs under ``<prefix>session:<id>``.
+    Secondary indexes are sorted sets scored by creation time under
+    ``<prefix>index:<name>`` (``index:all`` holds every session), and the
+    hash ``<prefix>index_names`` records which indexes each session is in so
+    a state transition only touches the indexes that changed. Writes WATCH
+    the session key while reading those names, so a concurrent write to the
+    same session makes the transaction retry instead of unfiling the wrong
+    entries. Reads only
+    bump the session's score in the ``<prefix>last_access`` sorted set; the
+    newer of that score and the stored value is returned as ``last_access``.
+    Capture job records live under ``<prefix>job:<id>`` until their TTL.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", key_prefix: str = "smart_photo:", client: Any = None):
+        if client is None:
+            try:
+                import redis.asyncio as redis_asyncio
+            except ImportError:
+                raise RuntimeError("The redis session backend requires the 'redis' package")
+            client = redis_asyncio.from_url(url)
+        self.client = client
+        self.key_prefix = key_prefix
+        self._all_key = self._index_key("all")
+        self._names_key = f"{key_prefix}index_names"
+        self._access_key = f"{key_prefix}last_access"
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.key_prefix}session:{session_id}"
+
+    def _index_key(self, name: str) -> str:
+        return f"{self.key_prefix}index:{name}"
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.key_prefix}job:{job_id}"
+
+    @staticmethod
+    def _load(data: Optional[bytes], touched: Optional[float]) -> Optional[PhotoSystemState]:
+        if data is None:
+            return None
+        state = deserialize_state(data)
+        if touched is not None and (state.last_access is None or touched > state.last_access):
+            state.last_access = float(touched)
+        return state
+
+    async def get(self, session_id: str) -> Optional[PhotoSystemState]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.get(self._key(session_id))
+            pipe.zscore(self._access_key, session_id)
+            data, touched = await pipe.execute()
+        return self._load(data, touched)
+
+    async def touch(self, session_id: str, last_access: float):
+        # GT: never move the access time backwards; XX: never resurrect a deleted session
+        await self.client.zadd(self._access_key, {session_id: last_access}, xx=True, gt=True)
+
+    def _queue_save(self, pipe: Any, state: PhotoSystemState, previous: Optional[str]):
+        """Queue the writes storing ``state``, given the index names it was filed under"""
+        score = sort_key(state)[0]
+        names = index_names(state)
+        previous_names = previous.split(",") if previous else []
+        pipe.set(self._key(state.session_id), serialize_state(state))
+        pipe.zadd(self._all_key, {state.session_id: score})
+        for name in previous_names:
+            if name not in names:
+                pipe.zrem(self._index_key(name), state.session_id)
+        for name in names:
+            if name not in previous_names:
+                pipe.zadd(self._index_key(name), {state.session_id: score})
+        pipe.hset(self._names_key, state.session_id, ",".join(names))
+        if state.last_access is not None:
+            pipe.zadd(self._access_key, {state.session_id: state.last_access})
+
+    async def save(self, state: PhotoSystemState):
+        key = self._key(state.session_id)
+        state.revision += 1
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # The previous index names must not change between reading them and
+                    # replacing them; every write to a session sets its key, so watch that
+                    await pipe.watch(key)
+                    previous = _text(await pipe.hget(self._names_key, state.session_id))
+                    pipe.multi()
+                    self._queue_save(pipe, state, previous)
+                    await pipe.execute()
+                    return
+                except WatchError:
+                    continue
+
+    async def update(self, session_id: str,
+                     apply: Callable[[PhotoSystemState], None]) -> Optional[PhotoSystemState]:
+        key = self._key(session_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # Every write to a session sets its key, so watching it catches any concurrent one
+                    await pipe.watch(key)
+                    data = await pipe.get(key)
+                    if data is None:
+                        await pipe.reset()
+                        return None
+                    state = self._load(data, await pipe.zscore(self._access_key, session_id))
+                    previous = _text(await pipe.hget(self._names_key, session_id))
+                    apply(state)
+                    state.revision += 1
+                    pipe.multi()
+                    self._queue_save(pipe, state, previous)
+                    await pipe.execute()
+                    return state
+                except WatchError:
+                    continue
+
+    async def delete(self, session_id: str) -> Optional[PhotoSystemState]:
+        key = self._key(session_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    previous = _text(await pipe.hget(self._names_key, session_id))
+                    pipe.multi()
+                    pipe.get(key)
+                    pipe.delete(key)
+                    pipe.zrem(self._all_key, session_id)
+                    for name in previous.split(",") if previous else []:
+                        pipe.zrem(self._index_key(name), session_id)
+                    pipe.hdel(self._names_key, session_id)
+                    pipe.zrem(self._access_key, session_id)
+                    data = (await pipe.execute())[0]
+                    break
+                except WatchError:
+                    continue
+        return deserialize_state(data) if data is not None else None
+
+    async def count(self) -> int:
+        return int(await self.client.zcard(self._all_key))
+
+    async def iter_states(self) -> AsyncIterator[PhotoSystemState]:
+        async for raw_id, _ in self.client.zscan_iter(self._all_key):
+            state = await self.get(_text(raw_id))
+            if state is not None:
+                yield state
+
+    async def list_page(self, limit: int, cursor: Optional[str] = None,
+                        index: Optional[str] = None) -> Tuple[List[PhotoSystemState], Optional[str]]:
+        key = self._index_key(index) if index else self._all_key
+        after = decode_cursor(cursor) if cursor else None
+        # One more than needed, so a full page knows whether anything follows
+        entries = await self._range_after(key, after, limit + 1)
+        page_entries = entries[:limit]
+        if not page_entries:
+            return [], None
+
+        ids = [session_id for _, session_id in page_entries]
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.mget([self._key(session_id) for session_id in ids])
+            pipe.zmscore(self._access_key, ids)
+            raw_states, touched = await pipe.execute()
+        # A session deleted between the two reads is skipped rather than returned empty
+        page = [state for state in map(self._load, raw_states, touched) if state is not None]
+        next_cursor = encode_cursor(page_entries[-1]) if len(entries) > limit else None
+        return page, next_cursor
+
+    async def _range_after(self, key: str, after: Optional[Tuple[float, str]],
+                           want: int) -> List[Tuple[float, str]]:
+        """Up to ``want`` index entries ordered after the cursor"""
+        num = want
+        while True:
+            entries = await self.client.zrangebyscore(
+                key, after[0] if after else "-inf", "+inf", start=0, num=num, withscores=True
+            )
+            # Entries tied on score with the cursor are ordered by member; drop those already seen
+            fresh = [(float(score), _text(raw_id)) for raw_id, score in entries]
+            fresh = [entry for entry in fresh if after is None or entry > after]
+            if len(fresh) >= want or len(entries) < num:
+                return fresh[:want]
+            num *= 2
+
+    async def expired_ids(self, idle_before: Optional[float], created_before: Optional[float],
+                          limit: int = 100) -> List[str]:
+        raw_ids = []
+        if idle_before is not None:
+            raw_ids += await self.client.zrangebyscore(self._access_key, "-inf", idle_before, start=0, num=limit)
+        if created_before is not None:
+            # index:all is scored by creation time
+            raw_ids += await self.client.zrangebyscore(self._all_key, "-inf", created_before, start=0, num=limit)
+        return list(dict.fromkeys(_text(raw_id) for raw_id in raw_ids))[:limit]
+
+    async def save_job(self, job_id: str, data: str, ttl: int):
+        await self.client.set(self._job_key(job_id), data, ex=ttl)
+
+    async def get_job(self, job_id: str) -> Optional[str]:
+        return _text(await self.client.get(self._job_key(job_id)))
+
+    async def close(self):
+        close = getattr(self.client, "aclose", None) or self.client.close
+        await close()
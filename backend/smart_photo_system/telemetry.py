@@ -0,0 +1,62 @@
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+# Node latencies span sub-millisecond refinements to multi-second device round trips
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60)
+
+
+class NodeMetrics:
+    """Prometheus metrics for graph node execution.
+
+    Each instance owns its registry so several graphs (e.g. in tests) do not
+    collide in the process-wide default registry.
+    """
+
+    content_type = CONTENT_TYPE_LATEST
+
+    def __init__(self):
+        self.registry = CollectorRegistry()
+        self.duration = Histogram(
+            "smart_photo_node_duration_seconds", "Node execution time",
+            ["node", "outcome"], buckets=LATENCY_BUCKETS, registry=self.registry
+        )
+        self.in_flight = Gauge(
+            "smart_photo_node_in_flight", "Node executions currently running",
+            ["node"], registry=self.registry
+        )
+        self.errors = Counter(
+            "smart_photo_node_errors_total", "Node executions that ended with an error",
+            ["node"], registry=self.registry
+        )
+        self.paths = Counter(
+            "smart_photo_node_path_total", "Node executions by the path that served them (e.g. http, simulation)",
+            ["node", "path"], registry=self.registry
+        )
+
+    @asynccontextmanager
+    async def track(self, node: str) -> AsyncIterator[Dict[str, str]]:
+        """Time one execution; set ``outcome["outcome"] = "error"`` to count it as failed"""
+        outcome = {"outcome": "ok"}
+        in_flight = self.in_flight.labels(node)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            yield outcome
+        except BaseException:
+            outcome["outcome"] = "error"
+            raise
+        finally:
+            in_flight.dec()
+            self.duration.labels(node, outcome["outcome"]).observe(time.perf_counter() - started)
+            if outcome["outcome"] == "error":
+                self.errors.labels(node).inc()
+
+    def record_path(self, node: str, path: str):
+        self.paths.labels(node, path).inc()
+
+    def render(self) -> bytes:
+        """Metrics in the Prometheus text exposition format"""
+        return generate_latest(self.registry)
@@ -0,0 +1,28 @@
+import os
+import uuid
+
+import fakeredis
+import pytest
+
+from smart_photo_system.sessions import InMemorySessionStore, RedisSessionStore
+
+
+@pytest.fixture(params=["memory", "redis"])
+def make_store(request):
+    """Factory for session stores of each backend.
+
+    Redis stores share one in-process fakeredis server, or a real server
+    when TEST_REDIS_URL is set (each test gets its own key prefix).
+    """
+    server = fakeredis.FakeServer()
+    redis_url = os.getenv("TEST_REDIS_URL")
+    key_prefix = f"smart_photo_test:{uuid.uuid4().hex}:"
+
+    def make():
+        if request.param == "memory":
+            return InMemorySessionStore()
+        if redis_url:
+            return RedisSessionStore(url=redis_url, key_prefix=key_prefix)
+        return RedisSessionStore(client=fakeredis.FakeAsyncRedis(server=server))
+
+    return make
@@ -0,0 +1,56 @@
+import asyncio
+
+from smart_photo_system.api import SmartPhotoAPI
+from smart_photo_system.jobs import CaptureJob
+from smart_photo_system.models.state import CameraParams, PhotoSystemState
+
+
+def _api(tmp_path, make_store):
+    api = SmartPhotoAPI({
+        "upload_dir": str(tmp_path / "uploads"),
+        "output_dir": str(tmp_path / "output"),
+        "analysis_max_workers": 0
+    })
+    api.sessions = make_store()
+    return api
+
+
+def _run_job(api, refine_during_capture: bool) -> PhotoSystemState:
+    def refine(state: PhotoSystemState):
+        state.final_params = CameraParams(exposure=1.0)
+        state.current_step = "ready_for_refinement"
+
+    async def step(state: PhotoSystemState, name: str) -> PhotoSystemState:
+        if name == "control":
+            if refine_during_capture:
+                await api.sessions.update("s1", refine)
+            state.current_step = "capture"
+        else:
+            state.captured_photo = "/tmp/photo.jpg"
+            state.current_step = "completed"
+        return state
+
+    async def run():
+        await api.sessions.save(PhotoSystemState(
+            session_id="s1", final_params=CameraParams(exposure=0.0), current_step="capture_ready"
+        ))
+        api.photo_graph.run_single_step = step
+        job = await api._run_capture_job(CaptureJob(session_id="s1"))
+        assert job.error_message is None
+        return await api.sessions.get("s1")
+
+    return asyncio.run(run())
+
+
+def test_capture_result_is_stored(tmp_path, make_store):
+    stored = _run_job(_api(tmp_path, make_store), refine_during_capture=False)
+    assert stored.captured_photo == "/tmp/photo.jpg"
+    assert stored.current_step == "completed"
+
+
+def test_refinement_during_capture_survives(tmp_path, make_store):
+    stored = _run_job(_api(tmp_path, make_store), refine_during_capture=True)
+    assert stored.captured_photo == "/tmp/photo.jpg"
+    assert stored.final_params.exposure == 1.0
+    # The refinement came last, so its step stands
+    assert stored.current_step == "ready_for_refinement"
@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import httpx
+
+from smart_photo_system.graph import SmartPhotoGraph
+from smart_photo_system.models.state import BracketSettings, CameraParams, PhotoSystemState
+
+PHOTO = b"\xff\xd8\xff\xe0" + b"\x00" * 256 + b"\xff\xd9"
+
+
+class MockPhone:
+    """Camera device that records every action and serves a fixed photo"""
+
+    def __init__(self):
+        self.actions = []
+        self.exposure = None
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            return httpx.Response(200, content=PHOTO, headers={"Content-Length": str(len(PHOTO))})
+        body = json.loads(request.content)
+        action = body["action"]
+        self.actions.append(action)
+        if action == "set_camera_params":
+            self.exposure = body["params"].get("exposure", self.exposure)
+            return httpx.Response(200, json={"success": True})
+        if action == "capture_bracket":
+            # The phone is left at the last frame's settings
+            self.exposure = body["frames"][-1]["exposure"]
+            photos = [{"photo_url": f"http://phone/photos/{index}.jpg"} for index in range(len(body["frames"]))]
+            return httpx.Response(200, json={"success": True, "photos": photos})
+        return httpx.Response(200, json={"success": True, "photo_url": "http://phone/photos/shot.jpg"})
+
+
+def _graph(tmp_path, phone: MockPhone) -> SmartPhotoGraph:
+    graph = SmartPhotoGraph({
+        "output_dir": str(tmp_path),
+        "iphone_api_endpoint": "http://phone/control",
+        "capture_api_endpoint": "http://phone/capture"
+    })
+    graph.device_client._client = httpx.AsyncClient(transport=httpx.MockTransport(phone.handle))
+    return graph
+
+
+async def _capture(graph: SmartPhotoGraph, state: PhotoSystemState) -> PhotoSystemState:
+    state = await graph.run_single_step(state, "control")
+    state = await graph.run_single_step(state, "capture")
+    assert state.error_message is None
+    return state
+
+
+def test_capture_after_bracket_resends_parameters(tmp_path):
+    async def run():
+        phone = MockPhone()
+        graph = _graph(tmp_path, phone)
+        state = PhotoSystemState(session_id="s1", final_params=CameraParams(exposure=0.5))
+        try:
+            state = await _capture(graph, state)
+            state.bracket = BracketSettings(frames=3, step=1.0)
+            state = await _capture(graph, state)
+            assert len(state.bracket_frames) == 3
+            state.bracket = None
+            phone.actions.clear()
+            await _capture(graph, state)
+        finally:
+            await graph.aclose()
+        return phone
+
+    phone = asyncio.run(run())
+    assert phone.actions == ["set_camera_params", "capture_photo"]
+    assert phone.exposure == 0.5
+
+
+def test_unchanged_parameters_are_not_resent(tmp_path):
+    async def run():
+        phone = MockPhone()
+        graph = _graph(tmp_path, phone)
+        state = PhotoSystemState(session_id="s1", final_params=CameraParams(exposure=0.5))
+        try:
+            state = await _capture(graph, state)
+            await _capture(graph, state)
+        finally:
+            await graph.aclose()
+        return phone
+
+    phone = asyncio.run(run())
+    assert phone.actions == ["set_camera_params", "capture_photo", "capture_photo"]
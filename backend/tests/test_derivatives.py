@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from PIL import Image
+
+from smart_photo_system.media import DerivativeCache, UndecodableImageError
+
+
+def _jpeg(path, size, orientation=None):
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+    Image.new("RGB", size, (120, 80, 40)).save(path, "JPEG", exif=exif.tobytes())
+    return str(path)
+
+
+def test_resize_uses_upright_width_for_rotated_photos(tmp_path):
+    # Stored landscape, displayed portrait (orientation 6 = rotate 90 degrees clockwise)
+    source = _jpeg(tmp_path / "rotated.jpg", (400, 300), orientation=6)
+    cache = DerivativeCache(str(tmp_path / "cache"))
+
+    path = asyncio.run(cache.get(source, 200))
+    with Image.open(path) as img:
+        assert img.size == (200, 267)
+
+    # Wider than the upright image: the source is served as is
+    assert asyncio.run(cache.get(source, 350)) == source
+
+
+def test_resize_keeps_aspect_ratio(tmp_path):
+    source = _jpeg(tmp_path / "plain.jpg", (400, 300))
+    cache = DerivativeCache(str(tmp_path / "cache"))
+
+    path = asyncio.run(cache.get(source, 100))
+    with Image.open(path) as img:
+        assert img.size == (100, 75)
+
+
+def test_undecodable_source_raises(tmp_path):
+    source = tmp_path / "simulated.jpg"
+    source.write_text("# This is a simulated photo file\n")
+    cache = DerivativeCache(str(tmp_path / "cache"))
+
+    with pytest.raises(UndecodableImageError):
+        asyncio.run(cache.get(str(source), 100))
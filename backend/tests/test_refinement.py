@@ -0,0 +1,45 @@
+import asyncio
+
+from smart_photo_system.models.state import CameraParams, PhotoSystemState
+from smart_photo_system.nodes import RefinementNode
+
+
+def _refine(node, state, *instructions):
+    for instruction in instructions:
+        state = asyncio.run(node.process_user_input(state, instruction))
+        assert state.error_message is None
+    return state
+
+
+def test_undo_and_redo_restore_neighbouring_parameters():
+    node = RefinementNode()
+    state = PhotoSystemState(session_id="s1", final_params=CameraParams(exposure=2.5, aperture="f/2.8"))
+    history = [state.final_params.model_copy()]
+    for instruction in ("increase exposure", "more background blur", "increase exposure"):
+        state = _refine(node, state, instruction)
+        history.append(state.final_params.model_copy())
+
+    # Exposure was clamped at +3, yet each undo restores exactly the earlier parameters
+    for position in (2, 1, 0):
+        state = node.undo(state)
+        assert state.final_params == history[position]
+    assert node.undo(state).error_message == "Nothing to undo"
+
+    state.error_message = None
+    for position in (1, 2, 3):
+        state = node.redo(state)
+        assert state.final_params == history[position]
+    assert node.redo(state).error_message == "Nothing to redo"
+
+
+def test_new_instruction_after_undo_discards_undone_entries():
+    node = RefinementNode()
+    state = PhotoSystemState(session_id="s1", final_params=CameraParams(exposure=0.0))
+    state = _refine(node, state, "increase exposure", "increase exposure")
+    state = node.undo(state)
+    state = _refine(node, state, "more background blur")
+
+    assert [refinement.user_input for refinement in state.refinements] == ["increase exposure", "more background blur"]
+    assert state.final_params.exposure == 0.5 and state.final_params.aperture == "f/1.6"
+    state = node.undo(state)
+    assert state.final_params == CameraParams(exposure=0.5)
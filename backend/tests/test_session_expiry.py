@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+import fakeredis
+
+from smart_photo_system.api import SmartPhotoAPI
+from smart_photo_system.models.state import PhotoSystemState
+from smart_photo_system.sessions import RedisSessionStore
+
+
+def _worker(tmp_path, server):
+    api = SmartPhotoAPI({
+        "upload_dir": str(tmp_path / "uploads"),
+        "output_dir": str(tmp_path / "output"),
+        "analysis_max_workers": 0,
+        "session_idle_ttl": 60,
+        "session_max_age": 3600
+    })
+    api.sessions = RedisSessionStore(client=fakeredis.FakeAsyncRedis(server=server))
+    return api
+
+
+def test_any_worker_expires_sessions_it_never_used(tmp_path):
+    server = fakeredis.FakeServer()
+    owner, other = _worker(tmp_path, server), _worker(tmp_path, server)
+    now = time.time()
+
+    async def run():
+        # Written by a worker that then died: only its own scheduler knew the deadlines
+        await owner.sessions.save(PhotoSystemState(session_id="idle", created_at=now - 120, last_access=now - 90))
+        await owner.sessions.save(PhotoSystemState(session_id="old", created_at=now - 7200, last_access=now - 1))
+        await owner.sessions.save(PhotoSystemState(session_id="live", created_at=now - 120, last_access=now - 10))
+        # A read on another worker keeps a session alive even though its stored state is stale
+        await owner.sessions.save(PhotoSystemState(session_id="touched", created_at=now - 120, last_access=now - 90))
+        await owner.sessions.touch("touched", now - 5)
+
+        await other._sweep_shared_sessions()
+        return {session_id: await other.sessions.get(session_id) is not None
+                for session_id in ("idle", "old", "live", "touched")}
+
+    assert asyncio.run(run()) == {"idle": False, "old": False, "live": True, "touched": True}
+
+
+def test_memory_store_has_no_shared_sweep(tmp_path):
+    api = SmartPhotoAPI({"upload_dir": str(tmp_path / "uploads"), "output_dir": str(tmp_path / "output")})
+    assert asyncio.run(api.sessions.expired_ids(time.time(), time.time())) == []
@@ -0,0 +1,184 @@
+import asyncio
+import threading
+
+import fakeredis
+
+from smart_photo_system.models.state import PhotoSystemState
+from smart_photo_system.sessions import RedisSessionStore, filter_index_name, serialize_state
+
+
+def test_update_applies_and_bumps_revision(make_store):
+    async def run():
+        store = make_store()
+        await store.save(PhotoSystemState(session_id="s1"))
+        revision = (await store.get("s1")).revision
+        updated = await store.update("s1", lambda state: setattr(state, "current_step", "capture"))
+        stored = await store.get("s1")
+        missing = await store.update("nope", lambda state: None)
+        return revision, updated, stored, missing
+
+    revision, updated, stored, missing = asyncio.run(run())
+    assert updated.current_step == stored.current_step == "capture"
+    assert stored.revision == revision + 1
+    assert missing is None
+
+
+def test_redis_update_retries_after_concurrent_write():
+    server = fakeredis.FakeServer()
+    store = RedisSessionStore(client=fakeredis.FakeAsyncRedis(server=server))
+    other_worker = fakeredis.FakeRedis(server=server)
+    calls = []
+
+    async def run():
+        await store.save(PhotoSystemState(session_id="s1", current_step="analyze"))
+        concurrent = serialize_state(
+            PhotoSystemState(session_id="s1", current_step="ready_for_refinement", error_message="x")
+        )
+
+        def apply(state: PhotoSystemState):
+            calls.append(state.current_step)
+            if len(calls) == 1:
+                # Another worker writes between this update's read and its write
+                other_worker.set(store._key("s1"), concurrent)
+            state.captured_photo = "/tmp/photo.jpg"
+
+        await store.update("s1", apply)
+        return await store.get("s1")
+
+    stored = asyncio.run(run())
+    # The first attempt was discarded and the update re-applied on the other worker's state
+    assert calls == ["analyze", "ready_for_refinement"]
+    assert stored.error_message == "x"
+    assert stored.captured_photo == "/tmp/photo.jpg"
+
+
+def _states():
+    steps = ["analyze", "capture_ready", "completed"]
+    return [
+        PhotoSystemState(
+            session_id=f"s{index:02d}", created_at=float(index // 3), current_step=steps[index % 3],
+            error_message="x" if index % 4 == 0 else None, captured_photo="p" if index % 5 == 0 else None
+        )
+        for index in range(30)
+    ]
+
+
+def _matches(state, current_step=None, has_error=None, has_photo=None) -> bool:
+    return (
+        current_step in (None, state.current_step)
+        and has_error in (None, state.error_message is not None)
+        and has_photo in (None, state.captured_photo is not None)
+    )
+
+
+async def _list_all(store, index):
+    ids, cursor = [], None
+    while True:
+        page, cursor = await store.list_page(4, cursor, index)
+        ids += [state.session_id for state in page]
+        if not cursor:
+            return ids
+
+
+def test_save_get_delete(make_store):
+    async def run():
+        store = make_store()
+        await store.save(PhotoSystemState(session_id="s1", current_step="analyze"))
+        loaded = await store.get("s1")
+        deleted = await store.delete("s1")
+        return loaded, deleted, await store.get("s1"), await store.delete("s1"), await store.count()
+
+    loaded, deleted, after, deleted_again, count = asyncio.run(run())
+    assert loaded.current_step == "analyze" and loaded.revision == 1
+    assert deleted.session_id == "s1"
+    assert after is None and deleted_again is None and count == 0
+
+
+def test_filtered_listing_follows_state_changes(make_store):
+    filters = [
+        {}, {"current_step": "completed"}, {"has_error": True},
+        {"current_step": "capture_ready", "has_error": False, "has_photo": True}, {"current_step": "nope"}
+    ]
+
+    async def run():
+        store = make_store()
+        states = {state.session_id: state for state in _states()}
+        for state in states.values():
+            await store.save(state)
+        # Move some sessions between indexes and delete others
+        for session_id in list(states)[::4]:
+            state = states[session_id].model_copy(update={"current_step": "completed", "error_message": None})
+            await store.save(state)
+            states[session_id] = state
+        for session_id in list(states)[1::7]:
+            await store.delete(session_id)
+            del states[session_id]
+
+        results = []
+        for selected in filters:
+            index = filter_index_name(**selected)
+            expected = sorted(
+                (state for state in states.values() if _matches(state, **selected)),
+                key=lambda state: (state.created_at, state.session_id)
+            )
+            results.append((await _list_all(store, index), [state.session_id for state in expected]))
+        return results, await store.count(), len(states)
+
+    results, count, expected_count = asyncio.run(run())
+    for listed, expected in results:
+        assert listed == expected
+    assert count == expected_count
+
+
+def test_touch_never_moves_back_or_resurrects(make_store):
+    async def run():
+        store = make_store()
+        await store.save(PhotoSystemState(session_id="s1", last_access=100.0))
+        await store.touch("s1", 50.0)
+        stale = (await store.get("s1")).last_access
+        await store.touch("s1", 200.0)
+        fresh = (await store.get("s1")).last_access
+        await store.delete("s1")
+        await store.touch("s1", 300.0)
+        return stale, fresh, await store.get("s1"), await store.count()
+
+    stale, fresh, resurrected, count = asyncio.run(run())
+    assert stale == 100.0 and fresh == 200.0
+    assert resurrected is None and count == 0
+
+
+def test_redis_concurrent_saves_keep_indexes_consistent():
+    server = fakeredis.FakeServer()
+    store = RedisSessionStore(client=fakeredis.FakeAsyncRedis(server=server))
+    queue_save = store._queue_save
+    interleaved = []
+
+    def other_worker_save():
+        async def save():
+            other = RedisSessionStore(client=fakeredis.FakeAsyncRedis(server=server))
+            await other.save(PhotoSystemState(session_id="s1", current_step="completed"))
+        asyncio.run(save())
+
+    def racing_queue_save(pipe, state, previous):
+        if not interleaved:
+            # Another worker moves the session to a different index after this save read its names
+            worker = threading.Thread(target=other_worker_save)
+            worker.start()
+            worker.join()
+            interleaved.append(worker)
+        queue_save(pipe, state, previous)
+
+    async def run():
+        await store.save(PhotoSystemState(session_id="s1", current_step="analyze"))
+        store._queue_save = racing_queue_save
+        await store.save(PhotoSystemState(session_id="s1", current_step="capture_ready"))
+        listed = {}
+        for step in ("analyze", "capture_ready", "completed"):
+            listed[step] = await _list_all(store, filter_index_name(current_step=step))
+        return (await store.get("s1")).current_step, listed
+
+    current_step, listed = asyncio.run(run())
+    assert interleaved
+    # Whichever write won, the session is filed under exactly its own step
+    assert listed[current_step] == ["s1"]
+    assert sum(len(ids) for ids in listed.values()) == 1
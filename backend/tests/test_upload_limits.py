@@ -0,0 +1,67 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from smart_photo_system.api import SmartPhotoAPI
+
+
+def _client(tmp_path, max_upload_bytes):
+    api = SmartPhotoAPI({
+        "upload_dir": str(tmp_path / "uploads"),
+        "output_dir": str(tmp_path / "output"),
+        "max_upload_bytes": max_upload_bytes,
+        "analysis_max_workers": 0
+    })
+    return TestClient(api.app)
+
+
+def _multipart(size):
+    boundary = "limit-test"
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="big.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return head + b"\xff" * size + tail, f"multipart/form-data; boundary={boundary}"
+
+
+def test_declared_oversized_body_is_rejected(tmp_path):
+    client = _client(tmp_path, 1024)
+    body, content_type = _multipart(200 * 1024)
+    response = client.post("/upload", content=body, headers={"Content-Type": content_type})
+    assert response.status_code == 413
+
+
+def test_chunked_oversized_body_is_cut_off(tmp_path):
+    api = SmartPhotoAPI({
+        "upload_dir": str(tmp_path / "uploads"),
+        "output_dir": str(tmp_path / "output"),
+        "max_upload_bytes": 1024,
+        "analysis_max_workers": 0
+    })
+    body, content_type = _multipart(1024 * 1024)
+    chunks = [body[start:start + 16 * 1024] for start in range(0, len(body), 16 * 1024)]
+    received = []
+    sent = []
+
+    async def receive():
+        index = len(received)
+        received.append(index)
+        return {"type": "http.request", "body": chunks[index], "more_body": index + 1 < len(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    # No Content-Length header, as with chunked transfer encoding
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/upload", "raw_path": b"/upload", "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", content_type.encode()), (b"host", b"test")],
+        "client": ("test", 1), "server": ("test", 80)
+    }
+    asyncio.run(api.app(scope, receive, send))
+
+    assert sent[0]["status"] == 413
+    # Reading stopped at the chunk that passed the limit
+    assert len(received) < 10